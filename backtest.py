@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def backtest(orders: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replays the order ledger over a daily price panel.
+
+    Orders are mapped to the first trading day on or after their transaction date and
+    scattered into a (days x assets) matrix of quantity changes; holdings, cash flows
+    and NAV then follow from cumulative sums and row-wise products, with no loop over
+    days or orders.
+
+    Every trade is treated as an external cash flow (a buy is a contribution, a sell a
+    withdrawal at the trade price). Daily returns use the Dietz method, with
+    contributions invested from the start of the day and withdrawals at its end:
+
+        r_t = (NAV_t - NAV_{t-1} - CF_t) / (NAV_{t-1} + max(CF_t, 0))
+
+    and are chained into the time-weighted return.
+
+    Parameters
+    ----------
+    orders : pd.DataFrame
+        Order ledger with ticker, order_type, quantity, price and transaction_date
+        columns.
+    prices : pd.DataFrame
+        Daily closing prices indexed by date, one column per ticker.
+
+    Returns
+    -------
+    pd.DataFrame
+        Daily NAV, cash flow, time-weighted return, cumulative return and drawdown,
+        indexed by date.
+    """
+    prices = prices.sort_index().ffill()
+    dates = pd.DatetimeIndex(prices.index).tz_localize(None).normalize()
+    price_matrix = prices.to_numpy(dtype=float)
+    n_days, n_assets = price_matrix.shape
+
+    orders = orders[orders["ticker"].isin(prices.columns)]
+    day = dates.searchsorted(pd.to_datetime(orders["transaction_date"]), side="left")
+    in_range = day < n_days
+    day = day[in_range]
+    orders = orders[in_range]
+    asset = prices.columns.get_indexer(orders["ticker"])
+    sign = np.where(orders["order_type"].str.upper().to_numpy() == "SELL", -1.0, 1.0)
+    quantity = sign * orders["quantity"].to_numpy(dtype=float)
+    trade_value = quantity * orders["price"].to_numpy(dtype=float)
+
+    changes = np.zeros((n_days, n_assets))
+    np.add.at(changes, (day, asset), quantity)
+    holdings = np.cumsum(changes, axis=0)
+    cash_flow = np.bincount(day, weights=trade_value, minlength=n_days)
+
+    valued = np.where(holdings != 0, price_matrix, 0.0)
+    nav = np.nansum(holdings * valued, axis=1)
+
+    previous = np.concatenate([[0.0], nav[:-1]])
+    invested = previous + np.maximum(cash_flow, 0.0)
+    daily_return = np.divide(
+        nav - previous - cash_flow, invested, out=np.zeros(n_days), where=invested > 0
+    )
+    wealth = np.cumprod(1.0 + daily_return)
+    drawdown = wealth / np.maximum.accumulate(wealth) - 1.0
+
+    return pd.DataFrame(
+        {
+            "nav": nav,
+            "cash_flow": cash_flow,
+            "daily_return": daily_return,
+            "cumulative_return": wealth - 1.0,
+            "drawdown": drawdown,
+        },
+        index=dates,
+    )
+
+
+def money_weighted_return(
+    dates: pd.DatetimeIndex,
+    cash_flows: np.ndarray,
+    final_value: float,
+    iterations: int = 100,
+) -> Optional[float]:
+    """
+    Computes the annualized money-weighted return (internal rate of return).
+
+    Parameters
+    ----------
+    dates : pd.DatetimeIndex
+        Dates of the cash flows.
+    cash_flows : np.ndarray
+        Amounts invested on each date (positive for contributions).
+    final_value : float
+        Portfolio value on the last date.
+    iterations : int
+        Maximum number of Newton steps.
+
+    Returns
+    -------
+    Optional[float]
+        Annualized IRR, or None if it does not converge.
+    """
+    mask = cash_flows != 0
+    if not mask.any():
+        return None
+    years = (dates - dates[0]).days.to_numpy() / 365.25
+    # investor perspective: contributions are outflows, the final value an inflow
+    flows = np.concatenate([-cash_flows[mask], [final_value]])
+    times = np.concatenate([years[mask], [years[-1]]])
+    rate = 0.1
+    for _ in range(iterations):
+        discount = (1.0 + rate) ** -times
+        npv = np.sum(flows * discount)
+        derivative = np.sum(-times * flows * discount / (1.0 + rate))
+        if derivative == 0:
+            return None
+        step = npv / derivative
+        rate = max(rate - step, -0.9999)
+        if abs(step) < 1e-10:
+            return rate
+    return None
+
+
+def backtest_summary(result: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarizes a backtest.
+
+    Parameters
+    ----------
+    result : pd.DataFrame
+        Output of backtest().
+
+    Returns
+    -------
+    pd.DataFrame
+        Total and annualized time-weighted return, money-weighted return, annualized
+        volatility and maximum drawdown. Like the TWR, the money-weighted return of a
+        period shorter than a year is not annualized.
+    """
+    active = result[result["nav"] > 0]
+    if active.empty:
+        active = result
+    # days before the first trade have zero return, so the last value is the total
+    total = result["cumulative_return"].iloc[-1]
+    # periods shorter than a year are not annualized
+    years = max(len(active) / TRADING_DAYS, 1.0)
+    cash_flows = result["cash_flow"].to_numpy()
+    mwr = money_weighted_return(result.index, cash_flows, result["nav"].iloc[-1])
+    if mwr is not None and len(active) < TRADING_DAYS:
+        # return over the period, from the first cash flow to the last date
+        first = result.index[np.flatnonzero(cash_flows)[0]]
+        mwr = (1 + mwr) ** ((result.index[-1] - first).days / 365.25) - 1
+    summary = pd.DataFrame(
+        {
+            "time-weighted return (%)": [total * 100],
+            "annualized TWR (%)": [((1 + total) ** (1 / years) - 1) * 100],
+            "money-weighted return (%)": [mwr * 100 if mwr is not None else np.nan],
+            "annualized volatility (%)": [
+                active["daily_return"].std() * np.sqrt(TRADING_DAYS) * 100
+            ],
+            "max drawdown (%)": [result["drawdown"].min() * 100],
+        }
+    )
+    summary = round(summary.T, 3)
+    summary.columns = ["stats"]
+    return summary
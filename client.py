@@ -0,0 +1,523 @@
+from datetime import datetime
+from typing import Optional
+
+import requests
+from requests.exceptions import RequestException
+
+from lazyload import lazy_import
+
+yf = lazy_import("yfinance")
+
+SERVER_BASE_URL = "http://127.0.01:5000"
+# seconds a server or yahoo! finance request may take before it fails
+REQUEST_TIMEOUT = 10
+
+
+class PortfolioClient:
+    """
+    Order-entry client: places orders and updates positions through the server.
+    """
+
+    def __init__(self, account: Optional[str] = None) -> None:
+        """
+        Initializes a client bound to an account.
+
+        Parameters
+        ----------
+        account : Optional[str]
+            Name of the strategy account. Uses the server default account if not provided.
+        """
+        self.account = account
+        if account is None:
+            self.base_url = SERVER_BASE_URL
+        else:
+            self.base_url = f"{SERVER_BASE_URL}/accounts/{account}"
+
+    def _validate_date(self, date: Optional[str] = None) -> str:
+        """
+        Validate and process date
+
+        Parameters
+        ----------
+        date : Optional[str]
+            The date string in 'YYYY-MM-DD' format. If not provided, uses today's date.
+
+        Returns
+        -------
+        str
+            A validated and properly formatted date string.
+
+        Raises
+        ------
+        ValueError
+            If the date format is incorrect or if the date is in the future.
+        """
+        if date is None:
+            return datetime.now().strftime("%Y-%m-%d")
+        try:
+            parsed_date = datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"Invalid date format: {date}. Expected format: %Y-%m-%d")
+
+        if parsed_date > datetime.now():
+            raise ValueError(
+                f"Invalid date: future date provided: {date} > {datetime.now().strftime('%Y-%m-%d')}"
+            )
+        return date
+
+    def _get_lastest_price(self, ticker: str) -> float:
+        """
+        Retrieves the lates closing price of a specified asset using yahoo! finance.
+
+        Parameters
+        ----------
+        ticker : str
+            The ticker symbol of the asset.
+
+        Returns
+        -------
+        float
+            The most recent closing price.
+
+        Raises
+        ------
+        ValueError
+            If price data retrieval fails.
+        """
+        try:
+            current_data = yf.Ticker(ticker).history(
+                period="1d", timeout=REQUEST_TIMEOUT
+            )
+            if current_data.empty:
+                raise ValueError(f"price fetch failed for '{ticker}'.")
+            price = current_data["Close"].iloc[-1]
+            return price
+        except Exception as err:
+            raise RuntimeError(f"Could not retrieve price for '{ticker}': {str(err)}")
+
+    def _fetch_portfolio_data(self) -> dict:
+        """
+        Fetches the current portfolio data from the backend server.
+
+        Returns
+        -------
+        dict
+            The portfolio data as JSON object.
+
+        Raises
+        ------
+        RequestException
+            If the server request fails.
+        """
+        try:
+            response = requests.get(
+                f"{self.base_url}/portfolio", timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            return response.json()
+        except RequestException as err:
+            raise RequestException(f"Failed to fetch portfolio data: {str(err)}")
+
+    def _fetch_orders_data(self, include_archive: bool = False) -> dict:
+        """
+        Fetches all order data from backend server.
+
+        Parameters
+        ----------
+        include_archive : bool
+            Also fetch the orders moved to archive partitions.
+
+        Returns
+        -------
+        dict
+            The orders data as JSON object.
+
+        Raise
+        -----
+        RequestException
+            If the server request fails.
+        """
+        try:
+            params = {"include_archive": 1} if include_archive else None
+            response = requests.get(
+                f"{self.base_url}/orders", params=params, timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            return response.json()
+        except RequestException as err:
+            raise RequestException(f"Failed to fetch orders data: {str(err)}")
+
+    def archive_orders(self, before: Optional[str] = None) -> dict:
+        """
+        Moves the orders of closed months to the server's archive partitions.
+
+        Parameters
+        ----------
+        before : Optional[str]
+            First month kept live, as 'YYYY-MM', at most the current month. Defaults to
+            the server retention.
+
+        Returns
+        -------
+        dict
+            The server's JSON response, listing the archived months.
+
+        Raises
+        ------
+        RequestException
+            If the server request fails.
+        """
+        data = {"before": before} if before is not None else {}
+        return self._post_to_server("orders/archive", data=data)
+
+    def open_lots(self, ticker: Optional[str] = None) -> list:
+        """
+        Fetches the open tax lots, optionally for a single asset.
+
+        Parameters
+        ----------
+        ticker : Optional[str]
+            The ticker symbol of the asset.
+
+        Returns
+        -------
+        list
+            Open lots with id, ticker, transaction date, remaining contracts and price.
+
+        Raises
+        ------
+        RequestException
+            If the server request fails.
+        """
+        params = {"ticker": ticker.upper()} if ticker else None
+        try:
+            response = requests.get(
+                f"{self.base_url}/lots", params=params, timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            return response.json()
+        except RequestException as err:
+            raise RequestException(f"Failed to fetch lots: {str(err)}")
+
+    def _post_to_server(self, endpoint: str, data: dict):
+        """
+        Internal helper to post JSON data to server and return the JSON sever response
+
+        Parameters
+        ----------
+        endpoint : str
+            The API endpoint.
+        data : dict
+            The JSON data to send.
+
+        Returns
+        -------
+        dict
+            The server's JSON response.
+
+        Raises
+        ------
+        RequestException
+            If the POST request fails.
+        """
+        try:
+            url = f"{self.base_url}/{endpoint}"
+            response = requests.post(url, json=data, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            print(f"server response: {response.json()}")
+            return response.json()
+        except RequestException as err:
+            raise RequestException(f"Failed to post data to '{endpoint}': {str(err)}")
+
+    def buy_order(
+        self,
+        ticker: str,
+        quantity: int,
+        price: Optional[float] = None,
+        date: Optional[str] = None,
+        currency: str = "USD",
+    ) -> None:
+        """
+        Executes a buy order for a given asset and updates portfolio state.
+
+        Parameters
+        ----------
+        ticker : str
+            The ticker symbol of the asset.
+        quantity : int
+            Number of contracts bought.
+        price : Optional[float]
+            Purchase price per contract. Fetched from yahoo! finance if not provided.
+        date : Optional[datetime]
+            Transaction date in 'YYYY-MM-DD' format. Defaults to current date if not provided.
+        currency : str
+            Currency of the transaction. Defaults to 'USD' (United States Dollar).
+
+        Raises
+        ------
+        ValueError
+            If parameters are invalid.
+        RequestException
+            If the server communication fails.
+        """
+        if not ticker:
+            raise ValueError("Buy order failed: ticker symbol must not be empty.")
+
+        if price is not None and price < 0:
+            raise ValueError(
+                f"Buy order failed: price must be a non-negative number: Received: {price}"
+            )
+
+        if quantity <= 0:
+            raise ValueError(
+                f"Buy order failed: quantity must be a positive integer: Received: {quantity}"
+            )
+        transaction_date = self._validate_date(date)
+        created_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        if price is None:
+            price = self._get_lastest_price(ticker)
+
+        cost_basis = quantity * price
+
+        ticker = ticker.upper()
+        currency = currency.upper()
+        order_data = {
+            "ticker": ticker,
+            "order_type": "BUY",
+            "quantity": quantity,
+            "currency": currency,
+            "transaction_date": transaction_date,
+            "price": round(price, 3),
+            "transaction_value": round(cost_basis, 3),
+            "created_date": created_date,
+            "last_updated_date": created_date,
+        }
+
+        try:
+            portfolio = self._fetch_portfolio_data()
+            existing_position = next(
+                (pos for pos in portfolio if pos["ticker"] == ticker), None
+            )
+            if existing_position:
+                new_quantity = existing_position["quantity"] + quantity
+                new_cost_basis = existing_position["cost_basis"] + cost_basis
+                new_avg_buy_price = new_cost_basis / new_quantity
+                market_price = self._get_lastest_price(ticker)
+                market_value = new_quantity * market_price
+                portfolio_data = {
+                    "ticker": ticker,
+                    "quantity": new_quantity,
+                    "currency": currency,
+                    "transaction_date": transaction_date,
+                    "avg_buy_price": round(new_avg_buy_price, 3),
+                    "cost_basis": round(new_cost_basis, 3),
+                    "market_price": round(market_price, 3),
+                    "market_value": round(market_value, 3),
+                    "pl": round(market_value - new_cost_basis, 3),
+                    "pl_pct": round(((market_value / new_cost_basis) - 1), 6),
+                    "created_date": existing_position["created_date"],
+                    "last_updated_date": created_date,
+                }
+            else:
+                portfolio_data = {
+                    "ticker": ticker,
+                    "quantity": quantity,
+                    "currency": currency,
+                    "transaction_date": transaction_date,
+                    "avg_buy_price": round(price, 3),
+                    "cost_basis": round(cost_basis, 3),
+                    "market_price": round(price, 3),
+                    "market_value": round(cost_basis, 3),
+                    "pl": 0.0,
+                    "pl_pct": 0.0,
+                    "created_date": created_date,
+                    "last_updated_date": created_date,
+                }
+
+            self._post_to_server("orders", data=order_data)
+            self._post_to_server("portfolio", data=portfolio_data)
+            print(
+                f"Buy order placed: {quantity} contracts of {ticker} at {price:.3f} {currency}"
+            )
+        except RequestException as err:
+            raise RequestException(
+                f"Buy order failed: unable to communicate with server: {str(err)}"
+            )
+
+    def sell_order(
+        self,
+        ticker: str,
+        quantity: int,
+        price: Optional[float] = None,
+        date: Optional[str] = None,
+        currency: str = "USD",
+        lot_method: str = "FIFO",
+        lot_ids: Optional[list] = None,
+    ) -> None:
+        """
+        Executes a sell order for a given asset and updates the portfolio state.
+
+        The server matches the sold contracts against open tax lots and records the
+        realized P&L of the order. The remaining position keeps the cost of the
+        unmatched lots.
+
+        Parameters
+        ----------
+        ticker : str
+            The ticker symbol of the asset.
+        quantity : int
+            Number of contracts sold.
+        price : Optional[float]
+            Sale price per contract. Fetched from yahoo! finance if not provided.
+        date : Optional[datetime]
+            Transaction date. Defaults to current date.
+        currency : str
+            Currency of the transaction. Defaults to 'USD' (United States Dollar).
+        lot_method : str
+            Tax lot matching method: 'FIFO', 'LIFO' or 'SPECIFIC'. Defaults to 'FIFO'.
+        lot_ids : Optional[list]
+            Ids of the lots to sell, in order, when lot_method is 'SPECIFIC'.
+
+        Raises
+        ------
+        ValueError
+            If parameters are invalid or the asset is not in the portfolio.
+        RequestException
+            If server communication fails.
+        """
+        if not ticker:
+            raise ValueError(f"Sell order failed: ticker symbol must not be empty.")
+
+        if price is not None and price < 0:
+            raise ValueError(
+                f"Sell order failed: price must be a non-negative number: Received: {price}"
+            )
+
+        if quantity <= 0:
+            raise ValueError(
+                f"Sell order failed: quantity must be a positive integer: Received: {quantity}"
+            )
+        transaction_date = self._validate_date(date)
+        created_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        if price is None:
+            price = self._get_lastest_price(ticker)
+
+        ticker = ticker.upper()
+        currency = currency.upper()
+
+        try:
+            portfolio = self._fetch_portfolio_data()
+            existing_position = next(
+                (pos for pos in portfolio if pos["ticker"] == ticker), None
+            )
+
+            if not existing_position:
+                raise ValueError(
+                    f"Sell order failed: no existing position found for ticker '{ticker}'"
+                )
+
+            # update existing position
+            new_quantity = existing_position["quantity"] - quantity
+            if new_quantity < 0:
+                raise ValueError(
+                    f"Sell order failed: attempting to sell more contracts than currently held ({quantity} > {existing_position['quantity']})."
+                )
+            order_data = {
+                "ticker": ticker,
+                "order_type": "SELL",
+                "quantity": quantity,
+                "currency": currency,
+                "transaction_date": transaction_date,
+                "price": round(price, 3),
+                "transaction_value": round(price * quantity, 3),
+                "lot_method": lot_method.upper(),
+                "lot_ids": lot_ids,
+                "created_date": created_date,
+                "last_updated_date": created_date,
+            }
+            order_response = self._post_to_server("orders", data=order_data)
+            # cost of the lots matched by the server, average cost if not reported
+            cost_basis = order_response.get("released_cost_basis")
+            if cost_basis is None:
+                cost_basis = quantity * existing_position["avg_buy_price"]
+            if new_quantity > 0:
+                new_cost_basis = existing_position["cost_basis"] - cost_basis
+                new_avg_buy_price = new_cost_basis / new_quantity
+                market_value = new_quantity * price
+                portfolio_data = {
+                    "ticker": ticker,
+                    "quantity": new_quantity,
+                    "currency": currency,
+                    "transaction_date": transaction_date,
+                    "avg_buy_price": round(new_avg_buy_price, 3),
+                    "cost_basis": round(new_cost_basis, 3),
+                    "market_price": round(price, 3),
+                    "market_value": round(market_value, 3),
+                    "pl": round(market_value - new_cost_basis, 3),
+                    "pl_pct": round(((market_value / new_cost_basis) - 1), 6),
+                    "created_date": existing_position["created_date"],
+                    "last_updated_date": created_date,
+                }
+            else:
+                portfolio_data = {
+                    "ticker": ticker,
+                    "quantity": new_quantity,
+                    "currency": currency,
+                    "transaction_date": transaction_date,
+                    "avg_buy_price": 0.0,
+                    "cost_basis": 0.0,
+                    "market_price": 0.0,
+                    "market_value": 0.0,
+                    "pl": 0.0,
+                    "pl_pct": 0.0,
+                    "created_date": existing_position["created_date"],
+                    "last_updated_date": created_date,
+                }
+
+            self._post_to_server("portfolio", data=portfolio_data)
+            print(
+                f"Sell order placed: {quantity} contracts of {ticker} at {price:.3f} {currency}"
+            )
+        except RequestException as err:
+            raise RequestException(
+                f"Sell order failed: unable to communicate with server: {str(err)}"
+            )
+
+    def update_portfolio_positions(self) -> None:
+        """
+        Updates all assets in the portfolio with the lastest market price, recalculating market value, P&L and P&L percentage.
+
+        Raises
+        ------
+        RequestException
+            If server communication fails.
+        """
+        last_updated_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            portfolio = self._fetch_portfolio_data()
+            for position in portfolio:
+                ticker = position["ticker"]
+                market_price = self._get_lastest_price(ticker)
+                market_value = position["quantity"] * market_price
+                portfolio_data = {
+                    "ticker": ticker,
+                    "quantity": position["quantity"],
+                    "currency": position["currency"],
+                    "transaction_date": position["transaction_date"],
+                    "avg_buy_price": position["avg_buy_price"],
+                    "cost_basis": position["cost_basis"],
+                    "market_price": round(market_price, 3),
+                    "market_value": round(market_value, 3),
+                    "pl": round(market_value - position["cost_basis"], 3),
+                    "pl_pct": round(((market_value / position["cost_basis"]) - 1), 6),
+                    "created_date": position["created_date"],
+                    "last_updated_date": last_updated_date,
+                }
+                self._post_to_server("portfolio", data=portfolio_data)
+        except RequestException as err:
+            raise RequestException(
+                f"Portfolio update failed: unable to communicate with server: {str(err)}"
+            )
+
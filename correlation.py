@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# columns of the correlation matrix computed per matrix product, bounds temporary memory
+CORRELATION_CHUNK = 256
+# assets shown in the correlation heatmap, so the chart has at most HEATMAP_MAX_ASSETS² cells
+HEATMAP_MAX_ASSETS = 20
+
+
+def correlation_matrix(returns: pd.DataFrame, chunk: int = CORRELATION_CHUNK) -> pd.DataFrame:
+    """
+    Computes the correlation matrix of asset returns in float32.
+
+    Returns are standardized once, and the matrix is filled CORRELATION_CHUNK columns at
+    a time as products of standardized blocks, so the working memory besides the
+    result is O(T x chunk) whatever the number of assets.
+
+    Parameters
+    ----------
+    returns : pd.DataFrame
+        Returns indexed by date, one column per asset, without missing values.
+    chunk : int
+        Number of assets per block.
+
+    Returns
+    -------
+    pd.DataFrame
+        Correlation matrix (float32) indexed by ticker on both axes.
+    """
+    z = returns.to_numpy(dtype=np.float32)
+    z = z - z.mean(axis=0)
+    norm = np.sqrt(np.einsum("ij,ij->j", z, z))
+    z /= np.where(norm > 0, norm, 1.0)
+    n = z.shape[1]
+    corr = np.empty((n, n), dtype=np.float32)
+    for start in range(0, n, chunk):
+        block = z[:, start : start + chunk]
+        corr[start : start + chunk] = block.T @ z
+    np.clip(corr, -1.0, 1.0, out=corr)
+    np.fill_diagonal(corr, 1.0)
+    return pd.DataFrame(
+        corr,
+        index=pd.Index(returns.columns, name="Ticker"),
+        columns=pd.Index(returns.columns, name="Ticker"),
+    )
+
+
+def cluster_order(corr: np.ndarray) -> np.ndarray:
+    """
+    Orders assets by average-linkage hierarchical clustering on 1 - correlation.
+
+    Clusters are merged with the Lance-Williams update and the nearest neighbour of
+    every cluster is cached, so a merge only rescans the rows whose nearest neighbour
+    was merged. Correlated assets end up next to each other, which makes blocks
+    visible in a heatmap.
+
+    Parameters
+    ----------
+    corr : np.ndarray
+        Correlation matrix.
+
+    Returns
+    -------
+    np.ndarray
+        Permutation of the asset indices, in dendrogram leaf order.
+    """
+    n = len(corr)
+    if n <= 2:
+        return np.arange(n)
+    dist = 1.0 - np.asarray(corr, dtype=np.float64)
+    np.fill_diagonal(dist, np.inf)
+    size = np.ones(n)
+    members = {i: [i] for i in range(n)}
+    nearest = dist.argmin(axis=1)
+    nearest_dist = dist[np.arange(n), nearest]
+    active = np.ones(n, dtype=bool)
+    for _ in range(n - 1):
+        a = int(np.argmin(np.where(active, nearest_dist, np.inf)))
+        b = int(nearest[a])
+        # merge b into a, updating distances by average linkage
+        merged = (size[a] * dist[a] + size[b] * dist[b]) / (size[a] + size[b])
+        merged[a] = np.inf
+        dist[a] = merged
+        dist[:, a] = merged
+        dist[b] = np.inf
+        dist[:, b] = np.inf
+        size[a] += size[b]
+        active[b] = False
+        nearest_dist[b] = np.inf
+        members[a] = members[a] + members.pop(b)
+        # rows whose nearest neighbour was a or b are rescanned, others compare with a
+        stale = active & ((nearest == a) | (nearest == b))
+        stale[a] = True
+        for i in np.flatnonzero(stale):
+            nearest[i] = dist[i].argmin()
+            nearest_dist[i] = dist[i, nearest[i]]
+        closer = active & ~stale & (merged < nearest_dist)
+        nearest[closer] = a
+        nearest_dist[closer] = merged[closer]
+    return np.array(members[int(np.flatnonzero(active)[0])])
+
+
+def clustered(corr: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reorders a correlation matrix by hierarchical clustering.
+
+    Parameters
+    ----------
+    corr : pd.DataFrame
+        Correlation matrix indexed by ticker on both axes.
+
+    Returns
+    -------
+    pd.DataFrame
+        The same matrix with rows and columns in cluster order.
+    """
+    order = cluster_order(corr.to_numpy())
+    return corr.iloc[order, order]
+
+
+def select_assets(
+    corr: pd.DataFrame,
+    k: int = HEATMAP_MAX_ASSETS,
+    by: str = "correlation",
+    weights: Optional[pd.Series] = None,
+    focus: Optional[str] = None,
+) -> list:
+    """
+    Selects a bounded subset of assets to display from a correlation matrix.
+
+    Parameters
+    ----------
+    corr : pd.DataFrame
+        Correlation matrix indexed by ticker on both axes.
+    k : int
+        Maximum number of assets.
+    by : str
+        'correlation' keeps the assets with the strongest correlation to any other
+        asset, 'weight' the heaviest positions (requires weights).
+    weights : Optional[pd.Series]
+        Portfolio weights indexed by ticker.
+    focus : Optional[str]
+        Drill down on a ticker: keep it and the k - 1 assets most correlated with it.
+
+    Returns
+    -------
+    list
+        Selected tickers, in the order of the matrix.
+
+    Raises
+    ------
+    ValueError
+        If the ranking is unknown, weights are missing or the focus ticker is unknown.
+    """
+    if focus is not None:
+        if focus not in corr.index:
+            raise ValueError(f"Unknown ticker: '{focus}'.")
+        score = corr[focus].abs().astype(float)
+        score[focus] = np.inf
+    elif by == "weight":
+        if weights is None:
+            raise ValueError("Ranking by weight requires portfolio weights.")
+        score = weights.reindex(corr.index).fillna(0.0).abs()
+    elif by == "correlation":
+        values = np.abs(corr.to_numpy())
+        np.fill_diagonal(values, 0.0)
+        score = pd.Series(values.max(axis=1), index=corr.index)
+    else:
+        raise ValueError(f"Unknown ranking: '{by}'. Expected 'correlation' or 'weight'.")
+    selected = set(score.nlargest(k).index)
+    return [ticker for ticker in corr.index if ticker in selected]
+
+
+def heatmap_data(corr: pd.DataFrame, tickers: list) -> pd.DataFrame:
+    """
+    Builds the long-format heatmap rows of a subset of assets.
+
+    Returns
+    -------
+    pd.DataFrame
+        Ticker, Ticker2 and Correlation columns, len(tickers)² rows.
+    """
+    sub = corr.loc[tickers, tickers].astype(float)
+    sub.index.name = "Ticker"
+    return sub.reset_index().melt("Ticker", var_name="Ticker2", value_name="Correlation")
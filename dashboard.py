@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Hashable, Optional
+
+# seconds a dashboard section may wait for fresh data before showing the last good result
+SECTION_BUDGET = float(os.environ.get("SECTION_BUDGET_MS", 2000)) / 1000
+DASHBOARD_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", 8))
+
+
+class SectionResult:
+    """Data of a dashboard section, with how fresh it is."""
+
+    __slots__ = ("value", "computed_at", "stale", "error")
+
+    def __init__(
+        self,
+        value: Any,
+        computed_at: Optional[float],
+        stale: bool,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        self.value = value
+        self.computed_at = computed_at
+        # True when the value is not the outcome of the latest refresh
+        self.stale = stale
+        self.error = error
+
+    @property
+    def ready(self) -> bool:
+        """Whether any result is available, fresh or stale."""
+        return self.computed_at is not None
+
+    @property
+    def age(self) -> float:
+        """Seconds since the value was computed."""
+        return time.time() - self.computed_at if self.ready else float("inf")
+
+
+class SectionCache:
+    """
+    Stale-while-revalidate cache of dashboard section data.
+
+    Every request starts a refresh on a worker pool, or joins the refresh already
+    running for the same key, and waits for it at most the section's latency budget.
+    When the refresh misses the budget or fails, the last good value is returned marked
+    stale and the refresh keeps running in the background, so a slow or throttled
+    upstream service delays a section by at most its budget.
+    """
+
+    def __init__(self, workers: int = DASHBOARD_WORKERS) -> None:
+        """
+        Parameters
+        ----------
+        workers : int
+            Number of threads computing section data.
+        """
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dashboard")
+        self._lock = threading.Lock()
+        self._values = {}
+        self._refreshing = {}
+
+    def _compute(self, key: Hashable, fn: Callable[[], Any]) -> tuple:
+        try:
+            entry = (time.time(), fn())
+            with self._lock:
+                self._values[key] = entry
+            return entry
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def refresh(self, key: Hashable, fn: Callable[[], Any]):
+        """
+        Starts computing a section, unless a refresh of the same key is running.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Future of the running refresh.
+        """
+        with self._lock:
+            future = self._refreshing.get(key)
+            if future is None:
+                future = self._pool.submit(self._compute, key, fn)
+                self._refreshing[key] = future
+        return future
+
+    def get(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        budget: Optional[float] = None,
+        max_age: Optional[float] = None,
+    ) -> SectionResult:
+        """
+        Returns the data of a section within a latency budget.
+
+        Parameters
+        ----------
+        key : Hashable
+            Identifies the section and its parameters (account, user inputs...).
+        fn : Callable[[], Any]
+            Computes the section data. Runs on a worker thread.
+        budget : Optional[float]
+            Seconds to wait for fresh data. Defaults to SECTION_BUDGET.
+        max_age : Optional[float]
+            Seconds a computed value is reused as is, without starting a refresh.
+            By default every call refreshes.
+
+        Returns
+        -------
+        SectionResult
+            The fresh value, or the last good value marked stale. If no value was ever
+            computed the result is not ready.
+
+        Raises
+        ------
+        Exception
+            The error of the refresh, if it failed and there is no previous value.
+        """
+        if max_age is not None:
+            with self._lock:
+                previous = self._values.get(key)
+            if previous is not None and time.time() - previous[0] < max_age:
+                return SectionResult(previous[1], previous[0], stale=False)
+        future = self.refresh(key, fn)
+        return self.wait(key, future, SECTION_BUDGET if budget is None else budget)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Forgets the value of a section, e.g. after a change it depends on."""
+        with self._lock:
+            self._values.pop(key, None)
+
+    def wait(self, key: Hashable, future, timeout: float) -> SectionResult:
+        """
+        Waits for a refresh started by refresh(), falling back to the last good value.
+        """
+        try:
+            computed_at, value = future.result(timeout=max(timeout, 0.0))
+            return SectionResult(value, computed_at, stale=False)
+        except FutureTimeoutError:
+            error = None
+        except Exception as err:
+            error = err
+        with self._lock:
+            previous = self._values.get(key)
+        if previous is None:
+            if error is not None:
+                raise error
+            return SectionResult(None, None, stale=True)
+        return SectionResult(previous[1], previous[0], stale=True, error=error)
+
+    def get_many(self, sections: dict) -> dict:
+        """
+        Computes several independent sections concurrently.
+
+        Every refresh is started before waiting on any of them, and each section's
+        budget runs from the same start, so the wait is bounded by the largest budget
+        rather than their sum.
+
+        Parameters
+        ----------
+        sections : dict
+            Mapping of name to (key, fn, budget) tuples; see get().
+
+        Returns
+        -------
+        dict
+            Mapping of name to SectionResult, or to the exception raised by a section
+            with no previous value.
+        """
+        start = time.monotonic()
+        futures = {
+            name: (key, self.refresh(key, fn), SECTION_BUDGET if budget is None else budget)
+            for name, (key, fn, budget) in sections.items()
+        }
+        results = {}
+        for name, (key, future, budget) in futures.items():
+            try:
+                results[name] = self.wait(key, future, start + budget - time.monotonic())
+            except Exception as err:
+                results[name] = err
+        return results
+
+
+_section_cache = SectionCache()
+
+
+def get_section(
+    key: Hashable,
+    fn: Callable[[], Any],
+    budget: Optional[float] = None,
+    max_age: Optional[float] = None,
+) -> SectionResult:
+    """
+    Returns the data of a dashboard section from the shared cache.
+
+    The cache lives as long as the Streamlit server, so all sessions and reruns share
+    refreshes and last good values. See SectionCache.get().
+    """
+    return _section_cache.get(key, fn, budget, max_age)
+
+
+def invalidate_section(key: Hashable) -> None:
+    """
+    Forgets the cached value of a dashboard section. See SectionCache.invalidate().
+    """
+    _section_cache.invalidate(key)
+
+
+def get_sections(sections: dict) -> dict:
+    """
+    Computes several dashboard sections concurrently from the shared cache.
+
+    See SectionCache.get_many().
+    """
+    return _section_cache.get_many(sections)
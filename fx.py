@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import Iterable
+
+from lazyload import lazy_import
+from marketdata import download
+
+pd = lazy_import("pandas")
+
+BASE_CURRENCY = "USD"
+FX_DATABASE = "fx_rates.db"
+
+# spot rates older than FX_SPOT_TTL seconds are downloaded again
+FX_SPOT_TTL = 15 * 60
+
+
+class FxRates:
+    """
+    Cached FX rate table used to value positions in a single base currency.
+
+    Spot and daily historical rates are downloaded from yahoo! finance in one batched
+    request per refresh and stored in a local SQLite database, so valuing a book only
+    needs one lookup per currency, never one per position.
+    """
+
+    def __init__(self, base: str = BASE_CURRENCY, database: str = FX_DATABASE) -> None:
+        """
+        Parameters
+        ----------
+        base : str
+            Base currency all amounts are converted to.
+        database : str
+            Path of the local SQLite database storing the rates.
+        """
+        self.base = base.upper()
+        self.database = database
+        self._spot = {}
+        self._lock = threading.Lock()
+        with sqlite3.connect(self.database) as conn:
+            conn.execute(
+                """
+            CREATE TABLE IF NOT EXISTS fx_spot (
+                base VARCHAR(32) NOT NULL,
+                currency VARCHAR(32) NOT NULL,
+                rate DOUBLE NOT NULL,
+                fetched_at DOUBLE NOT NULL,
+                PRIMARY KEY (base, currency)
+            )
+            """
+            )
+            conn.execute(
+                """
+            CREATE TABLE IF NOT EXISTS fx_history (
+                base VARCHAR(32) NOT NULL,
+                currency VARCHAR(32) NOT NULL,
+                date DATE NOT NULL,
+                rate DOUBLE NOT NULL,
+                PRIMARY KEY (base, currency, date)
+            )
+            """
+            )
+            rows = conn.execute(
+                "SELECT currency, rate, fetched_at FROM fx_spot WHERE base = ?",
+                (self.base,),
+            ).fetchall()
+        self._spot = {currency: (rate, fetched) for currency, rate, fetched in rows}
+
+    def _pair(self, currency: str) -> str:
+        """Returns the yahoo! finance ticker quoting one unit of currency in base."""
+        return f"{currency}{self.base}=X"
+
+    def _download(self, currencies: list, **kwargs) -> pd.DataFrame:
+        """
+        Downloads closing rates of several currencies in a single request.
+
+        Returns
+        -------
+        pd.DataFrame
+            Rates indexed by date, one column per currency.
+        """
+        pairs = [self._pair(c) for c in currencies]
+        close = download(pairs, **kwargs)["Close"]
+        if isinstance(close, pd.Series):
+            close = close.to_frame(pairs[0])
+        close = close.rename(columns={self._pair(c): c for c in currencies})
+        return close[currencies]
+
+    def spot(self, currencies: Iterable[str]) -> pd.Series:
+        """
+        Returns the current rate of each currency against the base currency.
+
+        Parameters
+        ----------
+        currencies : Iterable[str]
+            Currency codes.
+
+        Returns
+        -------
+        pd.Series
+            Rates indexed by currency. The base currency has rate 1.
+
+        Raises
+        ------
+        RuntimeError
+            If a rate cannot be retrieved.
+        """
+        currencies = sorted({c.upper() for c in currencies})
+        now = time.time()
+        with self._lock:
+            stale = [
+                c
+                for c in currencies
+                if c != self.base
+                and (c not in self._spot or now - self._spot[c][1] > FX_SPOT_TTL)
+            ]
+            if stale:
+                try:
+                    rates = self._download(stale, period="5d", interval="1d").ffill()
+                    latest = rates.iloc[-1]
+                except Exception as err:
+                    raise RuntimeError(
+                        f"Could not retrieve FX rates for {', '.join(stale)}: {str(err)}"
+                    )
+                fetched = [(c, float(latest[c])) for c in stale if pd.notna(latest[c])]
+                with sqlite3.connect(self.database) as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO fx_spot (base, currency, rate, fetched_at) VALUES (?, ?, ?, ?)",
+                        [(self.base, c, rate, now) for c, rate in fetched],
+                    )
+                self._spot.update({c: (rate, now) for c, rate in fetched})
+            missing = [c for c in currencies if c != self.base and c not in self._spot]
+            if missing:
+                raise RuntimeError(f"No FX rate available for {', '.join(missing)}.")
+            return pd.Series(
+                {c: 1.0 if c == self.base else self._spot[c][0] for c in currencies},
+                dtype=float,
+            )
+
+    def history(self, currencies: Iterable[str], index: pd.DatetimeIndex) -> pd.DataFrame:
+        """
+        Returns daily rates against the base currency aligned to a date index.
+
+        Stored rates are reused and the history is downloaded again only when it does
+        not cover the requested dates.
+
+        Parameters
+        ----------
+        currencies : Iterable[str]
+            Currency codes.
+        index : pd.DatetimeIndex
+            Dates the rates are aligned to, e.g. the index of a price panel.
+
+        Returns
+        -------
+        pd.DataFrame
+            Rates indexed like `index`, one column per currency. Missing days carry the
+            previous rate forward. The base currency is 1.
+        """
+        currencies = sorted({c.upper() for c in currencies})
+        foreign = [c for c in currencies if c != self.base]
+        history = pd.DataFrame(1.0, index=index, columns=currencies)
+        if not foreign or len(index) == 0:
+            return history
+        start = index.min().strftime("%Y-%m-%d")
+        # tolerate a few days without quotes (weekends, holidays) at either end before
+        # refreshing, since a panel of crypto prices has dates with no FX quote
+        first_needed = (index.min() + pd.Timedelta(days=4)).strftime("%Y-%m-%d")
+        end = (index.max() - pd.Timedelta(days=4)).strftime("%Y-%m-%d")
+        with self._lock, sqlite3.connect(self.database) as conn:
+            to_download = []
+            for currency in foreign:
+                first, last = conn.execute(
+                    "SELECT MIN(date), MAX(date) FROM fx_history WHERE base = ? AND currency = ?",
+                    (self.base, currency),
+                ).fetchone()
+                if first is None or first > first_needed or last < end:
+                    to_download.append(currency)
+            if to_download:
+                try:
+                    rates = self._download(to_download, start=start, interval="1d")
+                except Exception as err:
+                    raise RuntimeError(
+                        f"Could not retrieve FX history for {', '.join(to_download)}: {str(err)}"
+                    )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO fx_history (base, currency, date, rate) VALUES (?, ?, ?, ?)",
+                    [
+                        (self.base, currency, date.strftime("%Y-%m-%d"), float(rate))
+                        for currency in to_download
+                        for date, rate in rates[currency].dropna().items()
+                    ],
+                )
+            stored = pd.read_sql_query(
+                f"""
+            SELECT date, currency, rate FROM fx_history
+            WHERE base = ? AND currency IN ({', '.join('?' * len(foreign))})
+            """,
+                conn,
+                params=[self.base, *foreign],
+            )
+        stored = stored.pivot(index="date", columns="currency", values="rate")
+        stored.index = pd.to_datetime(stored.index)
+        dates = pd.DatetimeIndex(index).tz_localize(None).normalize()
+        aligned = stored.reindex(columns=foreign).sort_index().ffill()
+        aligned = aligned.reindex(dates, method="ffill").bfill()
+        history[foreign] = aligned.to_numpy()
+        return history
+
+    def convert(
+        self,
+        df: pd.DataFrame,
+        columns: Iterable[str],
+        currency_column: str = "currency",
+    ) -> pd.DataFrame:
+        """
+        Converts amount columns of a DataFrame to the base currency at spot rates.
+
+        All rows are converted with a single vectorized join on the currency column.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            DataFrame with one currency code per row.
+        columns : Iterable[str]
+            Names of the amount columns to convert.
+        currency_column : str
+            Name of the column holding the currency code.
+
+        Returns
+        -------
+        pd.DataFrame
+            Copy of the DataFrame with converted amounts and an 'fx_rate' column.
+        """
+        df = df.copy()
+        if df.empty:
+            df["fx_rate"] = pd.Series(dtype=float)
+            return df
+        currency = df[currency_column].str.upper()
+        df["fx_rate"] = currency.map(self.spot(currency.unique()))
+        for column in columns:
+            df[column] = df[column] * df["fx_rate"]
+        return df
+
+
+_fx_tables = {}
+_fx_tables_lock = threading.Lock()
+
+
+def get_fx_rates(base: str = BASE_CURRENCY) -> FxRates:
+    """
+    Returns the shared rate table of a base currency, so the in-memory spot cache
+    outlives single Portfolio instances.
+
+    Parameters
+    ----------
+    base : str
+        Base currency.
+
+    Returns
+    -------
+    FxRates
+        The shared rate table.
+    """
+    base = base.upper()
+    with _fx_tables_lock:
+        if base not in _fx_tables:
+            _fx_tables[base] = FxRates(base)
+        return _fx_tables[base]
+
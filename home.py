@@ -1,39 +1,128 @@
+import os
+
 import altair as alt
+import pandas as pd
 import streamlit as st
 from streamlit_autorefresh import st_autorefresh
 
+from correlation import HEATMAP_MAX_ASSETS, heatmap_data, select_assets
+from dashboard import SECTION_BUDGET, get_sections
+from intraday import get_intraday_book
 from portfolio import Portfolio
 
 # automatically refresh app every 10 secs
 st_autorefresh(interval=10 * 1000)
 
+# latency budget of the network-bound sections, in seconds; scaled from SECTION_BUDGET_MS
+# unless set per section
+POSITIONS_BUDGET = float(os.environ.get("POSITIONS_BUDGET_MS", SECTION_BUDGET * 1000)) / 1000
+ANALYTICS_BUDGET = float(os.environ.get("ANALYTICS_BUDGET_MS", SECTION_BUDGET * 1500)) / 1000
+OPTIMIZATION_BUDGET = (
+    float(os.environ.get("OPTIMIZATION_BUDGET_MS", SECTION_BUDGET * 2500)) / 1000
+)
+
 # init portfolio instance
 portfolio = Portfolio()
 
+
+def show_freshness(result, container=st) -> None:
+    """Notes a section rendered from its last good result while a refresh runs."""
+    if result.stale and result.ready:
+        note = f"Last updated {result.age:.0f}s ago"
+        if result.error is not None:
+            note += f" (latest refresh failed: {str(result.error)})"
+        container.caption(f"{note}, refreshing in the background.")
+
+
+def show_pending(container=st) -> None:
+    """Notes a section whose first computation is still running."""
+    container.info("Still loading, this section will appear on the next refresh.")
+
+
+def section(name: str):
+    """Returns the result of a section, raising the error of a failed one."""
+    result = sections[name]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def load_positions():
+    """Refreshes market prices and returns the positions."""
+    portfolio.update_portfolio_positions()
+    return portfolio._generate_portfolio_dataframe()
+
+
+def load_optimization(max_weight: float) -> tuple:
+    """Computes the efficient frontier and the current and max Sharpe allocations."""
+    mv_optimizer = portfolio.portfolio_optimizer(max_weight=max_weight)
+    frontier = mv_optimizer.efficient_frontier(n_points=50)
+    suggested = mv_optimizer.max_sharpe()
+    current = (
+        portfolio.assets_weights()
+        .set_index("ticker")["weight"]
+        .reindex(suggested.index)
+        .fillna(0.0)
+    )
+    portfolios = mv_optimizer.evaluate({"current": current, "max Sharpe": suggested})
+    return frontier, suggested, current, portfolios
+
+
 # write home page title
 st.title("Portfolio Dashboard")
 
+# compute every section concurrently; the slider value is read from the session state
+# so the optimization can start before the slider is drawn further down the page
+max_weight = st.session_state.get("max_weight", 1.0)
+sections = get_sections(
+    {
+        "cumulative_return": (
+            ("cumulative_return", portfolio.account),
+            portfolio.portfolio_cumulative_return,
+            ANALYTICS_BUDGET,
+        ),
+        "positions": (("positions", portfolio.account), load_positions, POSITIONS_BUDGET),
+        "stats": (("stats", portfolio.account), portfolio.portfolio_stats, ANALYTICS_BUDGET),
+        "risk": (("risk", portfolio.account), portfolio.portfolio_risk, ANALYTICS_BUDGET),
+        "correlation": (
+            ("correlation", portfolio.account),
+            portfolio.assets_correlation,
+            ANALYTICS_BUDGET,
+        ),
+        "weights": (("weights", portfolio.account), portfolio.assets_weights, ANALYTICS_BUDGET),
+        "optimization": (
+            ("optimization", portfolio.account, max_weight),
+            lambda: load_optimization(max_weight),
+            OPTIMIZATION_BUDGET,
+        ),
+    }
+)
+
 # calculate portfolio cumulative returns and generate chart
 try:
-    cum_ret = portfolio.portfolio_cumulative_return()
-    chart_data = cum_ret.reset_index()
-    chart_data.columns = ["date", "cumulative return"]
-    line_chart = (
-        alt.Chart(chart_data)
-        .mark_line()
-        .encode(
-            x=alt.X("date", axis=alt.Axis(format="%b %d", grid=True)),
-            y=alt.Y("cumulative return:Q", axis=alt.Axis(format=".0%")),
-            tooltip=[
-                alt.Tooltip("date:T", title="Date"),
-                alt.Tooltip("cumulative return:Q", title="Return", format=".3%"),
-            ],
+    cum_ret = section("cumulative_return")
+    if not cum_ret.ready:
+        show_pending()
+    else:
+        chart_data = cum_ret.value.reset_index()
+        chart_data.columns = ["date", "cumulative return"]
+        line_chart = (
+            alt.Chart(chart_data)
+            .mark_line()
+            .encode(
+                x=alt.X("date", axis=alt.Axis(format="%b %d", grid=True)),
+                y=alt.Y("cumulative return:Q", axis=alt.Axis(format=".0%")),
+                tooltip=[
+                    alt.Tooltip("date:T", title="Date"),
+                    alt.Tooltip("cumulative return:Q", title="Return", format=".3%"),
+                ],
+            )
+            .properties(title="Year-To-Date portfolio cumulative returns (%)", height=500)
+            .configure_axis(grid=True)
         )
-        .properties(title="Year-To-Date portfolio cumulative returns (%)", height=500)
-        .configure_axis(grid=True)
-    )
-    st.altair_chart(line_chart)
-except:
+        st.altair_chart(line_chart)
+        show_freshness(cum_ret)
+except Exception:
     st.error("Unable to generate cumulative returns chart.")
     st.info("There is no return data available. Your portfolio may currently be empty.")
 
@@ -41,116 +130,278 @@ except:
 st.header("Portfolio metrics", divider=True)
 
 # update portfolio positions and display portfolio dataframe
-portfolio.update_portfolio_positions()
 try:
-    data = portfolio._generate_portfolio_dataframe()
-    if data.empty:
-        st.warning(
-            "Your portfolio is currently empty. Add some assets to begin tracking performance."
+    positions = section("positions")
+    if not positions.ready:
+        show_pending()
+    else:
+        data = positions.value
+        if data.empty:
+            st.warning(
+                "Your portfolio is currently empty. Add some assets to begin tracking performance."
+            )
+        st.dataframe(
+            data=data.drop(columns=["created_date", "last_updated_date"]),
+            column_config={
+                "ticker": st.column_config.TextColumn(help="Asset ticker"),
+                "quantity": st.column_config.NumberColumn(help="Asset quantity owned"),
+                "currency": st.column_config.TextColumn(help="Currency of the trade"),
+                "transaction_date": st.column_config.TextColumn(
+                    label="last transaction date", help="Trade execution day"
+                ),
+                "avg_buy_price": st.column_config.NumberColumn(
+                    label="average buy price",
+                    help="Average price paid for a single contract",
+                ),
+                "cost_basis": st.column_config.NumberColumn(
+                    label="cost basis",
+                    help="Total amount invested for the single position",
+                ),
+                "market_price": st.column_config.NumberColumn(
+                    label="market price", help="Current market price of the asset"
+                ),
+                "market_value": st.column_config.NumberColumn(
+                    label="market value", help="Total market value of the single position"
+                ),
+                "pl": st.column_config.NumberColumn(label="P&L", help="Profit & Loss"),
+                "pl_pct": st.column_config.NumberColumn(
+                    label="P&L (%)", format="percent", help="P&L percentage"
+                ),
+            },
+            hide_index=True,
+            column_order=[
+                "ticker",
+                "quantity",
+                "currency",
+                "transaction_date",
+                "avg_buy_price",
+                "cost_basis",
+                "market_price",
+                "market_value",
+                "pl",
+                "pl_pct",
+                "created_date",
+                "last_updated_date",
+            ],
         )
-    st.dataframe(
-        data=data.drop(columns=["created_date", "last_updated_date"]),
-        column_config={
-            "ticker": st.column_config.TextColumn(help="Asset ticker"),
-            "quantity": st.column_config.NumberColumn(help="Asset quantity owned"),
-            "currency": st.column_config.TextColumn(help="Currency of the trade"),
-            "transaction_date": st.column_config.TextColumn(
-                label="last transaction date", help="Trade execution day"
-            ),
-            "avg_buy_price": st.column_config.NumberColumn(
-                label="average buy price",
-                help="Average price paid for a single contract",
-            ),
-            "cost_basis": st.column_config.NumberColumn(
-                label="cost basis",
-                help="Total amount invested for the single position",
-            ),
-            "market_price": st.column_config.NumberColumn(
-                label="market price", help="Current market price of the asset"
-            ),
-            "market_value": st.column_config.NumberColumn(
-                label="market value", help="Total market value of the single position"
-            ),
-            "pl": st.column_config.NumberColumn(label="P&L", help="Profit & Loss"),
-            "pl_pct": st.column_config.NumberColumn(
-                label="P&L (%)", format="percent", help="P&L percentage"
-            ),
-        },
-        hide_index=True,
-        column_order=[
-            "ticker",
-            "quantity",
-            "currency",
-            "transaction_date",
-            "avg_buy_price",
-            "cost_basis",
-            "market_price",
-            "market_value",
-            "pl",
-            "pl_pct",
-            "created_date",
-            "last_updated_date",
-        ],
-    )
-except:
+        show_freshness(positions)
+except Exception:
     st.error(f"Failed to load portfolio details.")
     st.info("Ensure assets have been added to the portfolio to view metrics.")
 
-# display portfolio stats, assets correlationa and portfolio allocation
-try:
-    # correlation data and chart
-    correlation_data = portfolio.assets_correlation().reset_index()
-    correlation_data = correlation_data.melt(
-        "Ticker", var_name="Ticker2", value_name="Correlation"
-    )
-    correlation_chart = (
-        alt.Chart(correlation_data)
-        .mark_rect()
-        .encode(
-            x="Ticker:O",
-            y="Ticker2:O",
-            color=alt.Color(
-                "Correlation:Q", scale=alt.Scale(scheme="redyellowblue", domain=[-1, 1])
-            ),
-            tooltip=["Ticker", "Ticker2", alt.Tooltip("Correlation:Q", format=".2")],
+# live intraday P&L, when a quote feed is configured
+intraday_book = get_intraday_book()
+if intraday_book is not None:
+    try:
+        positions = section("positions")
+        if positions.ready and not positions.value.empty:
+            data = positions.value
+            fx_rates = portfolio.fx.spot(data["currency"].unique()).to_dict()
+            intraday_book.set_positions(data.to_dict("records"), fx_rates)
+        times, pl = intraday_book.pl_history()
+        st.metric(
+            f"Live unrealized P&L ({portfolio.base_currency})",
+            f"{intraday_book.total_pl():,.2f}",
         )
-        .properties(title="Asset Correlaton Matrix", height=400)
-    )
-    correlation_text = correlation_chart.mark_text(baseline="middle").encode(
-        text=alt.Text("Correlation:Q", format=".2f"),
-        color=alt.value("black"),
-    )
-    correlation_chart = correlation_chart + correlation_text
-
-    # composition data and chart
-    portfolio_composition = portfolio.assets_weights()
-    weights_chart = (
-        alt.Chart(portfolio_composition)
-        .mark_arc()
-        .encode(
-            theta="weight",
-            color="ticker",
-            tooltip=[alt.Tooltip("ticker"), alt.Tooltip("weight:Q", format=".2%")],
-        )
-        .properties(title="Portfolio Allocation", height=400)
-    )
-    weights_text = weights_chart.mark_text(
-        radius=110, size=12, align="center", baseline="middle"
-    ).encode(
-        text="ticker:N",
-        color=alt.value("black"),
-        theta=alt.Theta("weight:Q", stack=True),
-    )
-    weights_chart = weights_chart + weights_text
+        if len(times):
+            st.line_chart(pd.DataFrame({"P&L": pl}, index=times), height=250)
+    except Exception:
+        st.error("Unable to load live intraday P&L.")
+
+# display portfolio stats, risk, assets correlationa and portfolio allocation
+try:
+    stats = section("stats")
+    risk = section("risk")
+    correlation = section("correlation")
+    composition = section("weights")
 
     # display stats, correlation and composition into container
     with st.container():
-        col1, col2, col3 = st.columns(3)
-        col1.dataframe(portfolio.portfolio_stats(), height=353, row_height=45)
-        col2.altair_chart(correlation_chart)
-        col3.altair_chart(weights_chart)
-except:
+        col1, col2, col3, col4 = st.columns(4)
+        if stats.ready:
+            col1.dataframe(stats.value, height=353, row_height=45)
+            show_freshness(stats, col1)
+        else:
+            show_pending(col1)
+
+        if risk.ready:
+            col2.dataframe(
+                risk.value,
+                height=353,
+                row_height=45,
+                hide_index=True,
+                column_config={
+                    "horizon (days)": st.column_config.NumberColumn(
+                        label="horizon", help="Horizon in trading days"
+                    ),
+                    "confidence": st.column_config.TextColumn(help="Confidence level"),
+                    "VaR (%)": st.column_config.NumberColumn(
+                        format="%.2f", help="Monte Carlo value at risk"
+                    ),
+                    "CVaR (%)": st.column_config.NumberColumn(
+                        format="%.2f", help="Expected shortfall beyond the VaR"
+                    ),
+                    "VaR": st.column_config.NumberColumn(format="%.0f"),
+                    "CVaR": st.column_config.NumberColumn(format="%.0f"),
+                },
+            )
+            show_freshness(risk, col2)
+        else:
+            show_pending(col2)
+
+        if correlation.ready:
+            # correlation data and chart, bounded to HEATMAP_MAX_ASSETS assets
+            matrix = correlation.value
+            ranking = col3.selectbox(
+                "Heatmap assets",
+                ["correlation", "weight"],
+                format_func=lambda by: f"Top {HEATMAP_MAX_ASSETS} by {by}",
+                key="heatmap_by",
+            )
+            focus = col3.selectbox(
+                "Drill down",
+                [None] + list(matrix.index),
+                format_func=lambda ticker: "All assets" if ticker is None else ticker,
+                key="heatmap_focus",
+            )
+            weights = (
+                composition.value.set_index("ticker")["weight"]
+                if composition.ready
+                else None
+            )
+            shown = select_assets(
+                matrix,
+                HEATMAP_MAX_ASSETS,
+                by=ranking if weights is not None else "correlation",
+                weights=weights,
+                focus=focus,
+            )
+            correlation_data = heatmap_data(matrix, shown)
+            correlation_chart = (
+                alt.Chart(correlation_data)
+                .mark_rect()
+                .encode(
+                    x=alt.X("Ticker:O", sort=shown),
+                    y=alt.Y("Ticker2:O", sort=shown),
+                    color=alt.Color(
+                        "Correlation:Q",
+                        scale=alt.Scale(scheme="redyellowblue", domain=[-1, 1]),
+                    ),
+                    tooltip=[
+                        "Ticker",
+                        "Ticker2",
+                        alt.Tooltip("Correlation:Q", format=".2"),
+                    ],
+                )
+                .properties(
+                    title=f"Asset Correlaton Matrix ({len(shown)} of {len(matrix)} assets)",
+                    height=400,
+                )
+            )
+            correlation_text = correlation_chart.mark_text(baseline="middle").encode(
+                text=alt.Text("Correlation:Q", format=".2f"),
+                color=alt.value("black"),
+            )
+            col3.altair_chart(correlation_chart + correlation_text)
+            show_freshness(correlation, col3)
+        else:
+            show_pending(col3)
+
+        if composition.ready:
+            # composition data and chart
+            weights_chart = (
+                alt.Chart(composition.value)
+                .mark_arc()
+                .encode(
+                    theta="weight",
+                    color="ticker",
+                    tooltip=[alt.Tooltip("ticker"), alt.Tooltip("weight:Q", format=".2%")],
+                )
+                .properties(title="Portfolio Allocation", height=400)
+            )
+            weights_text = weights_chart.mark_text(
+                radius=110, size=12, align="center", baseline="middle"
+            ).encode(
+                text="ticker:N",
+                color=alt.value("black"),
+                theta=alt.Theta("weight:Q", stack=True),
+            )
+            col4.altair_chart(weights_chart + weights_text)
+            show_freshness(composition, col4)
+        else:
+            show_pending(col4)
+except Exception:
     st.error(f"Unable to load portfolio insights.")
     st.info(
         "Please ensure your portfolio contains data to generate these visualizations."
     )
+
+# efficient frontier and suggested allocation
+st.header("Portfolio optimization", divider=True)
+try:
+    st.slider(
+        "Maximum weight per asset",
+        min_value=0.05,
+        max_value=1.0,
+        value=1.0,
+        step=0.05,
+        key="max_weight",
+    )
+    optimization = section("optimization")
+    if not optimization.ready:
+        show_pending()
+    else:
+        frontier, suggested, current, portfolios = optimization.value
+        frontier_chart = (
+            alt.Chart(frontier[["return", "volatility", "sharpe"]])
+            .mark_line()
+            .encode(
+                x=alt.X("volatility:Q", axis=alt.Axis(format=".0%")),
+                y=alt.Y("return:Q", axis=alt.Axis(format=".0%")),
+                tooltip=[
+                    alt.Tooltip("return:Q", format=".2%"),
+                    alt.Tooltip("volatility:Q", format=".2%"),
+                    alt.Tooltip("sharpe:Q", format=".2f"),
+                ],
+            )
+        )
+        portfolio_points = (
+            alt.Chart(portfolios)
+            .mark_point(size=120, filled=True)
+            .encode(
+                x="volatility:Q",
+                y="return:Q",
+                color="portfolio:N",
+                tooltip=[
+                    "portfolio",
+                    alt.Tooltip("return:Q", format=".2%"),
+                    alt.Tooltip("volatility:Q", format=".2%"),
+                ],
+            )
+        )
+        with st.container():
+            col1, col2 = st.columns([2, 1])
+            col1.altair_chart(
+                (frontier_chart + portfolio_points).properties(
+                    title="Efficient frontier (annualized)", height=400
+                )
+            )
+            allocation = suggested.rename("optimal weight").to_frame()
+            allocation.insert(0, "current weight", current)
+            allocation["change"] = allocation["optimal weight"] - allocation["current weight"]
+            col2.dataframe(
+                allocation.reset_index(names="ticker"),
+                hide_index=True,
+                height=400,
+                column_config={
+                    "current weight": st.column_config.NumberColumn(format="percent"),
+                    "optimal weight": st.column_config.NumberColumn(format="percent"),
+                    "change": st.column_config.NumberColumn(format="percent"),
+                },
+            )
+        show_freshness(optimization)
+except ValueError as err:
+    st.warning(f"Unable to optimize the portfolio: {str(err)}")
+except Exception:
+    st.error("Unable to compute the efficient frontier.")
+    st.info("At least two assets with price history are required to optimize the portfolio.")
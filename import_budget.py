@@ -0,0 +1,94 @@
+"""
+Measures the import time of each entry point and checks it against its budget.
+
+Each module is imported in a fresh interpreter several times and the best wall time
+is compared with IMPORT_BUDGETS. Modules listed in FORBIDDEN_MODULES must not be
+loaded by the import, so heavy analytics dependencies stay off the order-entry path.
+
+Usage: python import_budget.py [--runs N]
+"""
+
+import argparse
+import subprocess
+import sys
+
+# import time budget of each entry point, in seconds
+IMPORT_BUDGETS = {
+    "client": 0.25,
+    "portfolio": 0.3,
+    "server": 0.5,
+}
+
+# modules that must not be loaded when importing the entry point
+FORBIDDEN_MODULES = {
+    "client": ["pandas", "numpy", "yfinance"],
+    "portfolio": ["pandas", "numpy", "yfinance"],
+}
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [m for m in {forbidden!r} if m in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+
+def measure(module: str, runs: int) -> tuple:
+    """
+    Imports a module in fresh interpreters and returns its best import time.
+
+    Parameters
+    ----------
+    module : str
+        Name of the module to import.
+    runs : int
+        Number of fresh interpreters to run.
+
+    Returns
+    -------
+    tuple
+        Best import time in seconds and the forbidden modules it loaded.
+    """
+    forbidden = FORBIDDEN_MODULES.get(module, [])
+    best, loaded = float("inf"), []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, forbidden=forbidden)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        best = min(best, float(output[0]))
+        loaded = output[1].split(",") if len(output) > 1 else []
+    return best, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="imports per entry point")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'entry point':<12} {'time (ms)':>10} {'budget (ms)':>12}  status")
+    for module, budget in IMPORT_BUDGETS.items():
+        try:
+            elapsed, loaded = measure(module, args.runs)
+        except subprocess.CalledProcessError as err:
+            print(f"{module:<12} {'-':>10} {budget * 1000:>12.0f}  ERROR: {err.stderr.strip()}")
+            failures += 1
+            continue
+        status = "ok"
+        if elapsed > budget:
+            status = "OVER BUDGET"
+        if loaded:
+            status = f"LOADED {', '.join(loaded)}"
+        if status != "ok":
+            failures += 1
+        print(f"{module:<12} {elapsed * 1000:>10.1f} {budget * 1000:>12.0f}  {status}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import csv
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+# quotes kept per ticker: five sessions of 1-minute bars
+INTRADAY_CAPACITY = int(os.environ.get("INTRADAY_CAPACITY", 5 * 390))
+
+# recorded quotes replayed into the dashboard book, and the replay speed-up
+INTRADAY_REPLAY_FILE = os.environ.get("INTRADAY_REPLAY_FILE")
+INTRADAY_REPLAY_SPEED = float(os.environ.get("INTRADAY_REPLAY_SPEED", 60))
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer of (timestamp, price) quotes backed by two NumPy arrays.
+
+    Appending overwrites the oldest quote once the buffer is full, so memory stays at
+    capacity x 16 bytes and every append costs O(1) however long the session runs.
+    """
+
+    __slots__ = ("times", "prices", "head", "size")
+
+    def __init__(self, capacity: int) -> None:
+        self.times = np.zeros(capacity, dtype="datetime64[ns]")
+        self.prices = np.zeros(capacity, dtype=np.float64)
+        # index the next quote is written at
+        self.head = 0
+        self.size = 0
+
+    def append(self, timestamp: np.datetime64, price: float) -> None:
+        self.times[self.head] = timestamp
+        self.prices[self.head] = price
+        self.head = (self.head + 1) % len(self.prices)
+        self.size = min(self.size + 1, len(self.prices))
+
+    def last(self) -> Optional[tuple]:
+        if self.size == 0:
+            return None
+        return self.times[self.head - 1], float(self.prices[self.head - 1])
+
+    def ordered(self) -> tuple:
+        """Copies of the buffered timestamps and prices, oldest first."""
+        start = (self.head - self.size) % len(self.prices)
+        order = (start + np.arange(self.size)) % len(self.prices)
+        return self.times[order], self.prices[order]
+
+
+class IntradayBook:
+    """
+    Live marks and P&L of the portfolio positions, fed by intraday quotes.
+
+    Quotes for each ticker go into a RingBuffer. Each position's P&L and the
+    portfolio total are updated from the change in price since the previous quote, so
+    a quote costs O(1) whatever the number of positions. The total P&L after each
+    quote is kept in its own ring buffer for charting.
+
+    Any source yielding (timestamp, ticker, price) tuples can feed the book, e.g. a
+    ReplayFeed over a recorded file.
+    """
+
+    def __init__(self, capacity: int = INTRADAY_CAPACITY) -> None:
+        """
+        Parameters
+        ----------
+        capacity : int
+            Number of quotes kept per ticker and for the total P&L history.
+        """
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self._buffers = {}
+        self._positions = {}
+        self._total_pl = 0.0
+        self._pl_history = RingBuffer(capacity)
+
+    def set_positions(self, positions: Iterable[dict], fx_rates: Optional[dict] = None) -> None:
+        """
+        Replaces the positions the live P&L is computed for.
+
+        Positions are marked at their last quote, or at their market price until a
+        quote arrives. Costs O(positions), so call it when orders change the book,
+        not on every quote.
+
+        Parameters
+        ----------
+        positions : Iterable[dict]
+            Portfolio positions with ticker, quantity, avg_buy_price, market_price and
+            currency fields.
+        fx_rates : Optional[dict]
+            Rate of each currency against the base currency. Missing currencies count
+            as 1.
+        """
+        fx_rates = fx_rates or {}
+        with self.lock:
+            self._positions = {}
+            self._total_pl = 0.0
+            for position in positions:
+                ticker = position["ticker"]
+                last = self._buffers[ticker].last() if ticker in self._buffers else None
+                price = last[1] if last is not None else float(position["market_price"])
+                quantity = float(position["quantity"])
+                avg_price = float(position["avg_buy_price"])
+                rate = float(fx_rates.get(str(position["currency"]).upper(), 1.0))
+                pl = quantity * (price - avg_price)
+                # [quantity, average price, fx rate, last price, P&L in local currency]
+                self._positions[ticker] = [quantity, avg_price, rate, price, pl]
+                self._total_pl += pl * rate
+
+    def on_quote(self, timestamp, ticker: str, price: float) -> None:
+        """
+        Records a quote and updates the live P&L.
+
+        Parameters
+        ----------
+        timestamp : datetime-like
+            Time of the quote or bar close.
+        ticker : str
+            Ticker symbol.
+        price : float
+            Last trade or bar close price.
+        """
+        timestamp = np.datetime64(timestamp, "ns")
+        price = float(price)
+        with self.lock:
+            buffer = self._buffers.get(ticker)
+            if buffer is None:
+                buffer = self._buffers[ticker] = RingBuffer(self.capacity)
+            buffer.append(timestamp, price)
+            position = self._positions.get(ticker)
+            if position is not None:
+                change = position[0] * (price - position[3])
+                position[3] = price
+                position[4] += change
+                self._total_pl += change * position[2]
+            self._pl_history.append(timestamp, self._total_pl)
+
+    def total_pl(self) -> float:
+        """Returns the live unrealized P&L of the portfolio, in the base currency."""
+        return self._total_pl
+
+    def live_positions(self) -> list:
+        """
+        Returns the live mark and P&L of every position.
+
+        Returns
+        -------
+        list
+            Dictionaries with ticker, quantity, last price, P&L in the position
+            currency and P&L in the base currency.
+        """
+        with self.lock:
+            return [
+                {
+                    "ticker": ticker,
+                    "quantity": quantity,
+                    "last_price": price,
+                    "pl": pl,
+                    "base_pl": pl * rate,
+                }
+                for ticker, (quantity, _, rate, price, pl) in self._positions.items()
+            ]
+
+    def last_quote(self, ticker: str) -> Optional[tuple]:
+        """Returns the (timestamp, price) of the last quote of a ticker, if any."""
+        with self.lock:
+            buffer = self._buffers.get(ticker)
+            return buffer.last() if buffer is not None else None
+
+    def quotes(self, ticker: str) -> tuple:
+        """
+        Returns the buffered quotes of a ticker, oldest first.
+
+        Returns
+        -------
+        tuple
+            Arrays of timestamps (datetime64[ns]) and prices. Both are empty if the
+            ticker has no quotes.
+        """
+        with self.lock:
+            buffer = self._buffers.get(ticker)
+            if buffer is None:
+                return np.array([], dtype="datetime64[ns]"), np.array([])
+            return buffer.ordered()
+
+    def pl_history(self) -> tuple:
+        """
+        Returns the total P&L after each buffered quote, oldest first.
+
+        Returns
+        -------
+        tuple
+            Arrays of timestamps (datetime64[ns]) and P&L in the base currency.
+        """
+        with self.lock:
+            return self._pl_history.ordered()
+
+
+class ReplayFeed:
+    """
+    Replays recorded quotes from a CSV file with timestamp, ticker and price columns.
+
+    Iterating yields (timestamp, ticker, price) tuples in file order. With a speed the
+    replay sleeps between quotes to reproduce the recorded pace, sped up by that
+    factor; without one it yields as fast as it is consumed.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = None) -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            CSV file with a header row naming timestamp, ticker and price columns.
+        speed : Optional[float]
+            Replay speed relative to the recording, e.g. 60 plays a minute per second.
+        """
+        self.path = path
+        self.speed = speed
+
+    def __iter__(self) -> Iterator[tuple]:
+        previous = None
+        with open(self.path, newline="") as f:
+            for row in csv.DictReader(f):
+                timestamp = datetime.fromisoformat(row["timestamp"])
+                if timestamp.tzinfo is not None:
+                    timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+                if self.speed and previous is not None:
+                    delay = (timestamp - previous).total_seconds() / self.speed
+                    if delay > 0:
+                        time.sleep(delay)
+                previous = timestamp
+                yield timestamp, row["ticker"], float(row["price"])
+
+
+def run_feed(book: IntradayBook, source: Iterable[tuple]) -> threading.Thread:
+    """
+    Feeds a book from a quote source on a daemon thread.
+
+    Parameters
+    ----------
+    book : IntradayBook
+        Book receiving the quotes.
+    source : Iterable[tuple]
+        Yields (timestamp, ticker, price) tuples, e.g. a ReplayFeed.
+
+    Returns
+    -------
+    threading.Thread
+        The started feeding thread.
+    """
+
+    def pump() -> None:
+        for timestamp, ticker, price in source:
+            book.on_quote(timestamp, ticker, price)
+
+    thread = threading.Thread(target=pump, name="intraday-feed", daemon=True)
+    thread.start()
+    return thread
+
+
+_book = None
+_book_lock = threading.Lock()
+
+
+def get_intraday_book() -> Optional[IntradayBook]:
+    """
+    Returns the book shared by dashboard sessions, fed from INTRADAY_REPLAY_FILE.
+
+    Returns
+    -------
+    Optional[IntradayBook]
+        The shared book, or None if no quote source is configured.
+    """
+    global _book
+    if INTRADAY_REPLAY_FILE is None:
+        return None
+    with _book_lock:
+        if _book is None:
+            _book = IntradayBook()
+            run_feed(_book, ReplayFeed(INTRADAY_REPLAY_FILE, INTRADAY_REPLAY_SPEED))
+        return _book
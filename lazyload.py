@@ -0,0 +1,48 @@
+import importlib
+from types import ModuleType
+
+
+class LazyModule:
+    """
+    Module proxy that imports the real module on first attribute access.
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        Parameters
+        ----------
+        name : str
+            Fully qualified name of the module to import.
+        """
+        self._name = name
+        self._module = None
+
+    def _load(self) -> ModuleType:
+        """Imports the module, once."""
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Returns a proxy for a module that is imported only when first used.
+
+    Parameters
+    ----------
+    name : str
+        Fully qualified name of the module.
+
+    Returns
+    -------
+    LazyModule
+        The module proxy.
+    """
+    return LazyModule(name)
@@ -0,0 +1,308 @@
+"""
+Replays concurrent dashboard and order-entry traffic against a local server.
+
+A server is started on a copy of the database in a temporary directory (or an
+existing one is targeted with --server-url). At each concurrency level, N simulated
+dashboard sessions repeat the server calls of a home.py refresh every --refresh
+seconds, while traders place bursts of buy and sell orders through PortfolioClient.
+Market prices come from a local random-walk stub instead of yahoo! finance.
+
+Every HTTP request is timed, and the report gives throughput, p50/p95/p99 latency,
+error rate and lock-timeout rate per request type at each level.
+
+Usage: python loadtest.py [--levels 1,10,50] [--duration 30] [--traders 2]
+"""
+
+import argparse
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from client import PortfolioClient
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_SERVER = """
+import sys
+sys.path.insert(0, {repo!r})
+import server
+server.init_db()
+server._initialized.add(server.DATABASE)
+server.get_position_store(server.DATABASE)
+server.app.run(host="127.0.0.1", port={port}, threaded=True, debug=False, use_reloader=False)
+"""
+
+
+class StubMarket:
+    """Random-walk prices, so the load test never calls yahoo! finance."""
+
+    def __init__(self, seed: int = 0, volatility: float = 0.002) -> None:
+        self._rng = random.Random(seed)
+        self._prices = {}
+        self._volatility = volatility
+        self._lock = threading.Lock()
+
+    def price(self, ticker: str) -> float:
+        with self._lock:
+            price = self._prices.get(ticker, self._rng.uniform(20, 500))
+            price *= math.exp(self._rng.gauss(0, self._volatility))
+            self._prices[ticker] = price
+            return price
+
+
+class LoadTestClient(PortfolioClient):
+    """PortfolioClient pointed at the load-test server and priced by a StubMarket."""
+
+    def __init__(self, base_url: str, market: StubMarket) -> None:
+        super().__init__()
+        self.base_url = base_url
+        self.market = market
+
+    def _get_lastest_price(self, ticker: str) -> float:
+        return self.market.price(ticker)
+
+
+class Recorder:
+    """Thread-safe collection of (label, latency, outcome) samples."""
+
+    def __init__(self) -> None:
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, label: str, latency: float, outcome: str) -> None:
+        with self._lock:
+            self.samples.setdefault(label, []).append((latency, outcome))
+
+
+_recorder = None
+
+
+def _instrument() -> None:
+    """Times every HTTP request issued through requests, classifying its outcome."""
+    request = requests.Session.request
+
+    def timed(self, method, url, *args, **kwargs):
+        parts = urlsplit(url)
+        params = kwargs.get("params") or {}
+        label = f"{method.upper()} {parts.path}"
+        if params:
+            label += "?" + "&".join(sorted(params))
+        start = time.perf_counter()
+        try:
+            response = request(self, method, url, *args, **kwargs)
+        except requests.RequestException:
+            if _recorder is not None:
+                _recorder.add(label, time.perf_counter() - start, "error")
+            raise
+        outcome = "ok"
+        if response.status_code >= 400:
+            outcome = "locked" if "locked" in response.text.lower() else "error"
+        if _recorder is not None:
+            _recorder.add(label, time.perf_counter() - start, outcome)
+        return response
+
+    requests.Session.request = timed
+
+
+def _timed(label: str, fn, *args, **kwargs) -> None:
+    """Runs a client operation, recording its end-to-end latency."""
+    start = time.perf_counter()
+    try:
+        fn(*args, **kwargs)
+        outcome = "ok"
+    except Exception as err:
+        outcome = "locked" if "locked" in str(err).lower() else "error"
+    _recorder.add(label, time.perf_counter() - start, outcome)
+
+
+def dashboard_refresh(client: LoadTestClient) -> None:
+    """Issues the server calls of one home.py refresh."""
+    client.update_portfolio_positions()
+    client._fetch_portfolio_data()
+    for params in (None, {"weights": 1}):
+        requests.get(f"{client.base_url}/portfolio/summary", params=params).raise_for_status()
+    requests.get(f"{client.base_url}/realized_pl").raise_for_status()
+    client._fetch_orders_data(include_archive=True)
+
+
+def session(client: LoadTestClient, interval: float, stop: threading.Event) -> None:
+    """A dashboard viewer refreshing every interval seconds."""
+    # viewers do not open the page at the same instant
+    if stop.wait(random.uniform(0, interval)):
+        return
+    while not stop.is_set():
+        started = time.monotonic()
+        _timed("dashboard refresh", dashboard_refresh, client)
+        stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+
+def trader(
+    client: LoadTestClient, ticker: str, burst: int, interval: float, stop: threading.Event
+) -> None:
+    """An order-entry client placing bursts of round trips on its own ticker."""
+    while not stop.is_set():
+        started = time.monotonic()
+        for _ in range(burst):
+            _timed("buy_order", client.buy_order, ticker, 10)
+            _timed("sell_order", client.sell_order, ticker, 10)
+        stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of a sorted list."""
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def report(level: int, recorder: Recorder, elapsed: float) -> None:
+    """Prints throughput, latency percentiles and failure rates of each request type."""
+    print(f"\n{level} session(s), {elapsed:.1f}s")
+    print(
+        f"{'request':<40} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'errors':>7} {'locks':>7}"
+    )
+    for label in sorted(recorder.samples):
+        samples = recorder.samples[label]
+        latencies = sorted(latency * 1000 for latency, _ in samples)
+        errors = sum(outcome == "error" for _, outcome in samples)
+        locks = sum(outcome == "locked" for _, outcome in samples)
+        print(
+            f"{label[:40]:<40} {len(samples):>7} {len(samples) / elapsed:>8.1f} "
+            f"{percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} "
+            f"{percentile(latencies, 99):>8.1f} {errors / len(samples):>7.1%} "
+            f"{locks / len(samples):>7.1%}"
+        )
+
+
+def run_level(
+    base_url: str, level: int, args: argparse.Namespace, market: StubMarket
+) -> tuple:
+    """
+    Runs the sessions and traders of one concurrency level for args.duration.
+
+    Returns
+    -------
+    tuple
+        The recorded samples and the elapsed time in seconds.
+    """
+    global _recorder
+    _recorder = Recorder()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(
+            target=session,
+            args=(LoadTestClient(base_url, market), args.refresh, stop),
+            daemon=True,
+        )
+        for _ in range(level)
+    ]
+    threads += [
+        threading.Thread(
+            target=trader,
+            args=(
+                LoadTestClient(base_url, market),
+                f"LOAD{i}",
+                args.burst,
+                args.burst_interval,
+                stop,
+            ),
+            daemon=True,
+        )
+        for i in range(args.traders)
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    stop.wait(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    recorder, _recorder = _recorder, None
+    return recorder, time.monotonic() - start
+
+
+def start_server(workdir: str) -> tuple:
+    """Starts a server on a copy of the database and waits until it answers."""
+    shutil.copy(os.path.join(REPO_DIR, "securities_master.db"), workdir)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-c", _SERVER.format(repo=REPO_DIR, port=port)],
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{base_url}/accounts", timeout=1).raise_for_status()
+            return process, base_url
+        except requests.RequestException:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Load-test server did not start.")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--levels", default="1,10,50", help="comma-separated numbers of dashboard sessions"
+    )
+    parser.add_argument("--duration", type=float, default=30, help="seconds per level")
+    parser.add_argument("--refresh", type=float, default=10, help="dashboard refresh interval")
+    parser.add_argument("--traders", type=int, default=2, help="order-entry clients")
+    parser.add_argument("--burst", type=int, default=5, help="round trips per order burst")
+    parser.add_argument(
+        "--burst-interval", type=float, default=5, help="seconds between order bursts"
+    )
+    parser.add_argument("--server-url", help="target a running server instead of starting one")
+    parser.add_argument("--seed", type=int, default=0, help="stub market seed")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(",")]
+    market = StubMarket(args.seed)
+    random.seed(args.seed)
+    _instrument()
+
+    workdir, process = None, None
+    try:
+        if args.server_url:
+            base_url = args.server_url.rstrip("/")
+        else:
+            workdir = tempfile.mkdtemp(prefix="loadtest-")
+            process, base_url = start_server(workdir)
+        print(f"server: {base_url}")
+        stdout = sys.stdout
+        for level in levels:
+            # PortfolioClient prints every server response
+            sys.stdout = open(os.devnull, "w")
+            try:
+                recorder, elapsed = run_level(base_url, level, args, market)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+            report(level, recorder, elapsed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import sqlite3
+import threading
+from bisect import bisect_right
+from collections import deque
+from typing import Optional
+
+LOT_METHODS = ("FIFO", "LIFO", "SPECIFIC")
+
+
+class Lot:
+    """An open tax lot: contracts bought together at the same price."""
+
+    __slots__ = ("id", "ticker", "transaction_date", "remaining", "price")
+
+    def __init__(
+        self, id: int, ticker: str, transaction_date: str, remaining: int, price: float
+    ) -> None:
+        self.id = id
+        self.ticker = ticker
+        self.transaction_date = transaction_date
+        self.remaining = remaining
+        self.price = price
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "ticker": self.ticker,
+            "transaction_date": self.transaction_date,
+            "remaining": self.remaining,
+            "price": self.price,
+        }
+
+
+class LotBook:
+    """
+    In-memory index of the open tax lots of a database.
+
+    Open lots are kept per ticker in a deque ordered by transaction date, so FIFO
+    consumes from the left and LIFO from the right, and in a dictionary by lot id for
+    specific identification. Lots closed by specific identification are left in the
+    deque with nothing remaining and skipped when reached, so every sell costs
+    O(lots consumed).
+
+    The book only plans writes: matching methods mutate the index and return the
+    statements that persist the change, which the caller commits. If the commit fails
+    the caller must wait for the writes queued behind it to commit and call reload()
+    to resynchronize the index with the database.
+    """
+
+    def __init__(self, database: str) -> None:
+        """
+        Parameters
+        ----------
+        database : str
+            Path of the SQLite database holding the lots table.
+        """
+        self.database = database
+        self.lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        """Loads the open lots from the database."""
+        with sqlite3.connect(self.database) as conn:
+            rows = conn.execute(
+                """
+            SELECT id, ticker, transaction_date, remaining, price FROM lots
+            WHERE remaining > 0 ORDER BY ticker, transaction_date, id
+            """
+            ).fetchall()
+            next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM lots").fetchone()[0]
+        self._by_ticker = {}
+        self._by_id = {}
+        for row in rows:
+            lot = Lot(*row)
+            self._by_ticker.setdefault(lot.ticker, deque()).append(lot)
+            self._by_id[lot.id] = lot
+        self._next_id = next_id
+
+    def open_lots(self, ticker: Optional[str] = None) -> list:
+        """
+        Returns the open lots, optionally restricted to a ticker.
+
+        Parameters
+        ----------
+        ticker : Optional[str]
+            Ticker symbol of the asset.
+
+        Returns
+        -------
+        list
+            Open lots as dictionaries, in transaction date order.
+        """
+        tickers = [ticker] if ticker is not None else sorted(self._by_ticker)
+        return [
+            lot.to_dict()
+            for t in tickers
+            for lot in self._by_ticker.get(t, ())
+            if lot.remaining > 0
+        ]
+
+    def buy(
+        self, ticker: str, quantity: int, price: float, currency: str, transaction_date: str
+    ) -> list:
+        """
+        Opens a new lot for a buy order.
+
+        The returned statements must run right after the statement inserting the
+        order, which they reference through last_insert_rowid().
+
+        Returns
+        -------
+        list
+            Statements persisting the new lot, as (sql, params) tuples.
+        """
+        lot = Lot(self._next_id, ticker, transaction_date, quantity, price)
+        self._next_id += 1
+        lots = self._by_ticker.setdefault(ticker, deque())
+        if lots and lots[-1].transaction_date > transaction_date:
+            # backdated buy: insert at its date position (rare, costs O(open lots))
+            dates = [l.transaction_date for l in lots]
+            lots.insert(bisect_right(dates, transaction_date), lot)
+        else:
+            lots.append(lot)
+        self._by_id[lot.id] = lot
+        return [
+            (
+                """
+            INSERT INTO lots (id, ticker, order_id, transaction_date, quantity, remaining, price, currency)
+            VALUES (?, ?, last_insert_rowid(), ?, ?, ?, ?, ?)
+            """,
+                (lot.id, ticker, transaction_date, quantity, quantity, price, currency),
+            )
+        ]
+
+    def sell(
+        self,
+        ticker: str,
+        quantity: int,
+        price: float,
+        method: str = "FIFO",
+        lot_ids: Optional[list] = None,
+    ) -> tuple:
+        """
+        Matches a sell order against open lots.
+
+        Parameters
+        ----------
+        ticker : str
+            Ticker symbol of the asset.
+        quantity : int
+            Number of contracts sold.
+        price : float
+            Sale price per contract.
+        method : str
+            'FIFO', 'LIFO' or 'SPECIFIC'.
+        lot_ids : Optional[list]
+            Lots to consume, in order, for specific identification.
+
+        Returns
+        -------
+        tuple
+            Realized P&L, cost basis released and the statements persisting the
+            consumed lots.
+
+        Raises
+        ------
+        ValueError
+            If the method is unknown, a lot is invalid or listed twice, or lots are
+            insufficient.
+        """
+        method = method.upper()
+        if method not in LOT_METHODS:
+            raise ValueError(
+                f"Unknown lot matching method: '{method}'. Expected one of {', '.join(LOT_METHODS)}."
+            )
+        lots = self._by_ticker.get(ticker, deque())
+
+        # plan the matches first, so an invalid sell leaves the book untouched
+        matches = []
+        needed = quantity
+        if method == "SPECIFIC":
+            if not lot_ids:
+                raise ValueError("Specific lot identification requires lot ids.")
+            lot_ids = [int(lot_id) for lot_id in lot_ids]
+            if len(set(lot_ids)) < len(lot_ids):
+                raise ValueError("Each lot can be listed only once.")
+            for lot_id in lot_ids:
+                lot = self._by_id.get(lot_id)
+                if lot is None or lot.ticker != ticker or lot.remaining == 0:
+                    raise ValueError(f"Lot {lot_id} is not an open lot of '{ticker}'.")
+                take = min(needed, lot.remaining)
+                matches.append((lot, take))
+                needed -= take
+                if needed == 0:
+                    break
+        else:
+            ordered = iter(lots) if method == "FIFO" else reversed(lots)
+            for lot in ordered:
+                if needed == 0:
+                    break
+                if lot.remaining == 0:
+                    continue
+                take = min(needed, lot.remaining)
+                matches.append((lot, take))
+                needed -= take
+        if needed > 0:
+            raise ValueError(
+                f"Not enough open lots of '{ticker}' to sell {quantity} contracts ({quantity - needed} available)."
+            )
+
+        realized_pl, released = 0.0, 0.0
+        statements = []
+        for lot, take in matches:
+            released += take * lot.price
+            realized_pl += take * (price - lot.price)
+            lot.remaining -= take
+            statements.append(
+                (
+                    "UPDATE lots SET remaining = remaining - ? WHERE id = ?",
+                    (take, lot.id),
+                )
+            )
+            if lot.remaining == 0:
+                del self._by_id[lot.id]
+        # drop exhausted lots from the ends of the deque
+        while lots and lots[0].remaining == 0:
+            lots.popleft()
+        while lots and lots[-1].remaining == 0:
+            lots.pop()
+        return round(realized_pl, 3), round(released, 3), statements
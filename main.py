@@ -1,9 +1,5 @@
 import streamlit as st
 
-from portfolio import Portfolio
-
-portfolio = Portfolio()
-
 # set page config
 st.set_page_config(
     page_title="Portfolio management",
@@ -0,0 +1,35 @@
+import threading
+
+from lazyload import lazy_import
+
+yf = lazy_import("yfinance")
+
+# seconds yahoo! finance may take to answer a download
+DOWNLOAD_TIMEOUT = 10
+
+# yf.download collects the results of a call in module globals, so two downloads
+# running at once (dashboard sections refresh on parallel workers) can mix up each
+# other's tickers or wait forever: downloads are serialized process-wide
+_download_lock = threading.Lock()
+
+
+def download(tickers, **kwargs):
+    """
+    Downloads market data from yahoo! finance, one download at a time per process.
+
+    Parameters
+    ----------
+    tickers : str or list
+        Ticker symbols to download.
+    **kwargs
+        Arguments of yfinance.download (period, start, interval...).
+
+    Returns
+    -------
+    pd.DataFrame
+        The yfinance.download result.
+    """
+    kwargs.setdefault("progress", False)
+    kwargs.setdefault("timeout", DOWNLOAD_TIMEOUT)
+    with _download_lock:
+        return yf.download(tickers, **kwargs)
@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# projected gradient stops when no weight moves more than OPTIMIZER_TOLERANCE
+OPTIMIZER_TOLERANCE = 1e-8
+OPTIMIZER_MAX_ITER = 5_000
+
+
+def project_box_simplex(
+    v: np.ndarray, lower: float, upper: float, iterations: int = 20
+) -> np.ndarray:
+    """
+    Projects each row of v onto {w : sum(w) = 1, lower <= w <= upper}.
+
+    The projection is clip(v - tau, lower, upper) for the shift tau that makes each
+    row sum to one. tau is bracketed by bisection on all rows at once and then
+    refined with a Newton step on the piecewise linear residual.
+
+    Parameters
+    ----------
+    v : np.ndarray
+        Points to project, one per row.
+    lower : float
+        Lower bound of every weight.
+    upper : float
+        Upper bound of every weight.
+    iterations : int
+        Number of bisection steps.
+
+    Returns
+    -------
+    np.ndarray
+        Projected points, same shape as v.
+    """
+    v = np.atleast_2d(v)
+    lo = v.min(axis=1, keepdims=True) - upper
+    hi = v.max(axis=1, keepdims=True) - lower
+    for _ in range(iterations):
+        tau = (lo + hi) / 2
+        excess = np.clip(v - tau, lower, upper).sum(axis=1, keepdims=True) - 1
+        lo = np.where(excess > 0, tau, lo)
+        hi = np.where(excess > 0, hi, tau)
+    tau = (lo + hi) / 2
+    for _ in range(2):
+        shifted = v - tau
+        excess = np.clip(shifted, lower, upper).sum(axis=1, keepdims=True) - 1
+        free = ((shifted > lower) & (shifted < upper)).sum(axis=1, keepdims=True)
+        tau = tau + np.where(free > 0, excess / np.maximum(free, 1), 0)
+    return np.clip(v - tau, lower, upper)
+
+
+def shrink_covariance(returns: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ledoit-Wolf covariance estimate: the sample covariance shrunk towards a scaled
+    identity.
+
+    With as many assets as observations the sample covariance is singular, and the
+    optimizer would see portfolios with zero (or, by rounding, negative) variance.
+    The shrunk estimate is positive definite, and the shrinkage intensity vanishes as
+    observations outnumber assets.
+
+    Parameters
+    ----------
+    returns : pd.DataFrame
+        Returns indexed by date, one column per asset, without missing values.
+
+    Returns
+    -------
+    pd.DataFrame
+        Covariance matrix indexed by ticker on both axes.
+    """
+    x = returns.to_numpy(dtype=float)
+    t, n = x.shape
+    x = x - x.mean(axis=0)
+    sample = x.T @ x / t
+    mu = np.trace(sample) / n
+    target_distance = np.sum(sample**2) - 2 * mu * np.trace(sample) + n * mu * mu
+    # sum over dates of ||x_t x_t' - S||^2 = sum ||x_t||^4 - T ||S||^2
+    noise = (np.sum(np.einsum("ij,ij->i", x, x) ** 2) - t * np.sum(sample**2)) / t**2
+    shrinkage = min(noise, target_distance) / target_distance if target_distance > 0 else 1.0
+    cov = (1 - shrinkage) * sample + shrinkage * mu * np.eye(n)
+    # same normalization as DataFrame.cov()
+    cov *= t / max(t - 1, 1)
+    return pd.DataFrame(cov, index=returns.columns, columns=returns.columns)
+
+
+class MeanVarianceOptimizer:
+    """
+    Mean-variance optimizer under budget, long-only and weight-cap constraints.
+
+    Every problem is reduced to the parametric program
+
+        minimize w' S w - lambda * m' w  subject to  sum(w) = 1, lower <= w <= upper
+
+    solved by accelerated projected gradient. Several risk aversions are solved as a
+    single batch (one matrix product per iteration) and every solve can be warm-started
+    from a previous solution, which is how the efficient frontier is traced.
+
+    The covariance should be positive definite (see shrink_covariance()). A singular
+    one, e.g. a sample covariance of more assets than observations, gets a small
+    ridge so that no portfolio has zero variance.
+    """
+
+    def __init__(
+        self,
+        mean: np.ndarray,
+        cov: np.ndarray,
+        tickers: Optional[Sequence[str]] = None,
+        max_weight: float = 1.0,
+        long_only: bool = True,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        mean : np.ndarray
+            Expected asset returns.
+        cov : np.ndarray
+            Covariance matrix of asset returns.
+        tickers : Optional[Sequence[str]]
+            Asset names used to label the results.
+        max_weight : float
+            Maximum weight of a single asset.
+        long_only : bool
+            Forbids short positions. When False weights may go down to -max_weight.
+
+        Raises
+        ------
+        ValueError
+            If the constraints admit no fully invested portfolio.
+        """
+        self.mean = np.asarray(mean, dtype=float)
+        self.cov = np.asarray(cov, dtype=float)
+        n = len(self.mean)
+        self.tickers = list(tickers) if tickers is not None else list(range(n))
+        self.upper = float(max_weight)
+        self.lower = 0.0 if long_only else -float(max_weight)
+        if self.upper * n < 1:
+            raise ValueError(
+                f"Infeasible weight cap: {n} assets capped at {self.upper:.2%} cannot sum to 100%."
+            )
+        eigenvalues = np.linalg.eigvalsh(self.cov)
+        ridge = 1e-6 * max(eigenvalues[-1], 1e-12)
+        if eigenvalues[0] < ridge:
+            self.cov = self.cov + (ridge - eigenvalues[0]) * np.eye(n)
+            eigenvalues = eigenvalues + (ridge - eigenvalues[0])
+        # step size from the Lipschitz constant of the gradient 2 S w
+        self._step = 1 / (2 * eigenvalues[-1])
+        self._start = project_box_simplex(np.full(n, 1 / n), self.lower, self.upper)
+
+    def solve(
+        self, risk_aversion: Sequence[float], start: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Solves the parametric program for a batch of risk aversions.
+
+        Parameters
+        ----------
+        risk_aversion : Sequence[float]
+            Weights lambda of the expected return term, one problem each.
+        start : Optional[np.ndarray]
+            Warm start, one row per problem (or a single row for all problems).
+
+        Returns
+        -------
+        np.ndarray
+            Optimal weights, one row per problem.
+        """
+        lam = np.asarray(risk_aversion, dtype=float).reshape(-1, 1)
+        if start is None:
+            start = self._start
+        x = np.broadcast_to(np.atleast_2d(start), (len(lam), len(self.mean))).copy()
+        y, t = x.copy(), 1.0
+        linear = lam * self.mean
+        for _ in range(OPTIMIZER_MAX_ITER):
+            grad = 2 * y @ self.cov - linear
+            x_next = project_box_simplex(y - self._step * grad, self.lower, self.upper)
+            if np.abs(x_next - x).max() < OPTIMIZER_TOLERANCE:
+                return x_next
+            t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+            momentum = (t - 1) / t_next
+            # restart the momentum when it stops decreasing the objective
+            if np.any(np.sum((y - x_next) * (x_next - x), axis=1) > 0):
+                t_next, momentum = 1.0, 0.0
+            y = x_next + momentum * (x_next - x)
+            x, t = x_next, t_next
+        return x
+
+    def _stats(self, weights: np.ndarray) -> tuple:
+        """Expected return and volatility of each row of weights."""
+        weights = np.atleast_2d(weights)
+        ret = weights @ self.mean
+        # rounding can make the variance of a near riskless portfolio slightly negative
+        vol = np.sqrt(np.maximum(np.einsum("ij,jk,ik->i", weights, self.cov, weights), 0.0))
+        return ret, vol
+
+    def evaluate(self, portfolios: dict) -> pd.DataFrame:
+        """
+        Computes expected return, volatility and Sharpe ratio of given allocations.
+
+        Parameters
+        ----------
+        portfolios : dict
+            Mapping of portfolio name to weights (pd.Series indexed by ticker).
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per portfolio.
+        """
+        names = list(portfolios)
+        weights = np.vstack(
+            [
+                pd.Series(portfolios[name]).reindex(self.tickers).fillna(0.0).to_numpy()
+                for name in names
+            ]
+        )
+        ret, vol = self._stats(weights)
+        return pd.DataFrame(
+            {
+                "portfolio": names,
+                "return": ret,
+                "volatility": vol,
+                "sharpe": self._sharpe(weights, 0.0),
+            }
+        )
+
+    def _as_series(self, weights: np.ndarray) -> pd.Series:
+        return pd.Series(np.ravel(weights), index=self.tickers, name="weight")
+
+    def _risk_aversion_grid(self, n_points: int) -> np.ndarray:
+        """
+        Risk aversions spanning the frontier, from the minimum variance portfolio
+        (lambda = 0) to a lambda large enough for the return term to dominate.
+        """
+        spread = np.ptp(self.mean) or 1.0
+        high = 1e3 * np.trace(self.cov) / len(self.mean) / spread
+        return np.concatenate([[0.0], np.geomspace(high * 1e-5, high, n_points - 1)])
+
+    def min_variance(self) -> pd.Series:
+        """
+        Returns the minimum variance portfolio.
+
+        Returns
+        -------
+        pd.Series
+            Portfolio weights indexed by ticker.
+        """
+        return self._as_series(self.solve([0.0]))
+
+    def target_return(self, target: float, tolerance: float = 1e-6) -> pd.Series:
+        """
+        Returns the minimum variance portfolio with the given expected return.
+
+        The frontier return is increasing in lambda, so lambda is found by bisection,
+        warm-starting each solve from the previous one.
+
+        Parameters
+        ----------
+        target : float
+            Target expected return.
+        tolerance : float
+            Accepted distance from the target return.
+
+        Returns
+        -------
+        pd.Series
+            Portfolio weights indexed by ticker.
+
+        Raises
+        ------
+        ValueError
+            If the target return is not reachable under the constraints.
+        """
+        weights = self.solve([0.0])
+        if self._stats(weights)[0][0] >= target - tolerance:
+            return self._as_series(weights)
+        lo, hi = 0.0, self._risk_aversion_grid(2)[-1]
+        top = self.solve([hi], start=weights)
+        while self._stats(top)[0][0] < target - tolerance:
+            if hi > 1e12:
+                raise ValueError(f"Target return {target:.4f} is not reachable.")
+            lo, hi = hi, hi * 10
+            top = self.solve([hi], start=top)
+        for _ in range(100):
+            mid = (lo + hi) / 2
+            weights = self.solve([mid], start=weights)
+            ret = self._stats(weights)[0][0]
+            if abs(ret - target) < tolerance:
+                break
+            lo, hi = (mid, hi) if ret < target else (lo, mid)
+        return self._as_series(weights)
+
+    def max_sharpe(self, risk_free: float = 0.0, n_points: int = 20) -> pd.Series:
+        """
+        Returns the maximum Sharpe ratio portfolio.
+
+        The best point of a coarse frontier is refined by golden-section search on the
+        risk aversion between its neighbours, warm-starting every solve.
+
+        Parameters
+        ----------
+        risk_free : float
+            Risk-free rate, in the same units as the expected returns.
+        n_points : int
+            Number of frontier points used to bracket the optimum.
+
+        Returns
+        -------
+        pd.Series
+            Portfolio weights indexed by ticker.
+        """
+        grid = self._risk_aversion_grid(n_points)
+        frontier = self._trace(grid)
+        best = int(np.nanargmax(self._sharpe(frontier, risk_free)))
+        a, b = grid[max(best - 1, 0)], grid[min(best + 1, len(grid) - 1)]
+        best_weights = frontier[best]
+
+        golden = (np.sqrt(5) - 1) / 2
+        c, d = b - golden * (b - a), a + golden * (b - a)
+        wc = self.solve([c], start=best_weights)
+        wd = self.solve([d], start=wc)
+        sc, sd = self._sharpe(wc, risk_free)[0], self._sharpe(wd, risk_free)[0]
+        for _ in range(20):
+            if b - a < 1e-2 * b:
+                break
+            if sc > sd:
+                b, d, wd, sd = d, c, wc, sc
+                c = b - golden * (b - a)
+                wc = self.solve([c], start=wd)
+                sc = self._sharpe(wc, risk_free)[0]
+            else:
+                a, c, wc, sc = c, d, wd, sd
+                d = a + golden * (b - a)
+                wd = self.solve([d], start=wc)
+                sd = self._sharpe(wd, risk_free)[0]
+        candidates = [best_weights, wc, wd]
+        scores = [self._sharpe(w, risk_free)[0] for w in candidates]
+        return self._as_series(candidates[int(np.nanargmax(scores))])
+
+    def _sharpe(self, weights: np.ndarray, risk_free: float) -> np.ndarray:
+        """Sharpe ratio of each row of weights."""
+        ret, vol = self._stats(weights)
+        return (ret - risk_free) / np.maximum(vol, 1e-12)
+
+    def _trace(self, grid: np.ndarray) -> np.ndarray:
+        """
+        Solves the frontier in batches of increasing risk aversion, warm-starting each
+        batch from the last solution of the previous one.
+        """
+        solutions = []
+        start = None
+        for batch in np.array_split(grid, max(1, len(grid) // 10)):
+            weights = self.solve(batch, start=start)
+            solutions.append(weights)
+            start = weights[-1]
+        return np.vstack(solutions)
+
+    def efficient_frontier(self, n_points: int = 50, risk_free: float = 0.0) -> pd.DataFrame:
+        """
+        Traces the efficient frontier with evenly spaced expected returns.
+
+        A coarse frontier maps risk aversion to expected return; the risk aversions of
+        the requested points are interpolated from it and solved as one batch,
+        each point warm-started from the nearest coarse solution.
+
+        Parameters
+        ----------
+        n_points : int
+            Number of frontier portfolios.
+        risk_free : float
+            Risk-free rate used for the Sharpe ratio.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per frontier portfolio with its expected return, volatility,
+            Sharpe ratio and the weight of each ticker.
+        """
+        grid = self._risk_aversion_grid(10)
+        coarse = self._trace(grid)
+        coarse_ret = np.maximum.accumulate(self._stats(coarse)[0])
+        targets = np.linspace(coarse_ret[0], coarse_ret[-1], n_points)
+        # the grid is geometric, so interpolate log(lambda); lambda = 0 maps to a tiny value
+        log_grid = np.log(np.maximum(grid, grid[1] * 1e-3))
+        lam = np.exp(np.interp(targets, coarse_ret, log_grid))
+        nearest = np.clip(np.searchsorted(grid, lam), 0, len(grid) - 1)
+        weights = self.solve(lam, start=coarse[nearest])
+        ret, vol = self._stats(weights)
+        frontier = pd.DataFrame(weights, columns=self.tickers)
+        frontier.insert(0, "sharpe", self._sharpe(weights, risk_free))
+        frontier.insert(0, "volatility", vol)
+        frontier.insert(0, "return", ret)
+        return frontier
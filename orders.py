@@ -2,12 +2,69 @@ from time import sleep
 
 import streamlit as st
 
+from dashboard import get_section, invalidate_section
 from portfolio import Portfolio
 
+# seconds the dialog waits for the what-if engine before showing the form without it
+WHATIF_BUDGET = 1.0
+# seconds a built what-if engine is reused; placing an order rebuilds it
+WHATIF_TTL = 5 * 60
+
 portfolio = Portfolio()
 st.title("Orders dashboard")
 
 
+def show_impact(ticker: str, quantity: int, order_type: str, price, currency: str):
+    """
+    Previews the effect of the order on portfolio weights and volatility.
+    """
+    try:
+        engine = get_section(
+            ("whatif", portfolio.account),
+            portfolio.what_if_engine,
+            WHATIF_BUDGET,
+            max_age=WHATIF_TTL,
+        )
+        if not engine.ready:
+            st.caption("Risk preview is loading...")
+            return
+        fx_rate = 1.0
+        if price is not None and currency != portfolio.base_currency:
+            fx_rate = float(portfolio.fx.spot([currency])[currency])
+        impact = engine.value.preview_order(ticker, quantity, order_type, price, fx_rate)
+    except Exception as err:
+        st.caption(f"No risk preview: {err}")
+        return
+    table = engine.value.impact_table(impact)
+    weight = table.loc[ticker]
+    col1, col2, col3 = st.columns(3)
+    col1.metric(
+        "Volatility",
+        f"{impact['volatility']:.2%}",
+        f"{impact['volatility'] - engine.value.volatility:+.2%}",
+        delta_color="inverse",
+    )
+    col2.metric(
+        f"{ticker} weight",
+        f"{weight['new weight']:.2%}",
+        f"{weight['new weight'] - weight['current weight']:+.2%}",
+    )
+    col3.metric(
+        f"{ticker} risk share",
+        f"{weight['new risk contribution']:.2%}",
+        f"{weight['new risk contribution'] - weight['current risk contribution']:+.2%}",
+        delta_color="inverse",
+    )
+    with st.expander("Weights and risk contributions"):
+        st.dataframe(
+            table.sort_values("new risk contribution", ascending=False),
+            column_config={
+                column: st.column_config.NumberColumn(format="percent")
+                for column in table.columns
+            },
+        )
+
+
 @st.dialog("Order dialog")
 def order_dialog():
     """
@@ -33,6 +90,24 @@ def order_dialog():
     currency = st.text_input(
         label="Insert trade currency", value="USD", placeholder="Currency"
     ).upper()
+    lot_method, lot_ids = "FIFO", None
+    if order_type == "SELL":
+        lot_method = st.selectbox(
+            label="Tax lot matching", options=("FIFO", "LIFO", "SPECIFIC")
+        )
+        if lot_method == "SPECIFIC" and ticker:
+            lots = portfolio.open_lots(ticker)
+            lot_ids = st.multiselect(
+                label="Lots to sell",
+                options=[lot["id"] for lot in lots],
+                format_func=lambda lot_id: next(
+                    f"#{lot['id']} - {lot['remaining']} @ {lot['price']} ({lot['transaction_date']})"
+                    for lot in lots
+                    if lot["id"] == lot_id
+                ),
+            )
+    if ticker and quantity and order_type:
+        show_impact(ticker.upper(), quantity, order_type, price, currency)
     try:
         if st.button("Submit order"):
             if not all([ticker, quantity, order_type, currency]):
@@ -53,7 +128,10 @@ def order_dialog():
                     price=price,
                     date=date,
                     currency=currency,
+                    lot_method=lot_method,
+                    lot_ids=lot_ids,
                 )
+            invalidate_section(("whatif", portfolio.account))
             st.success("Order placed successfully!")
             sleep(1)
             st.rerun()
@@ -86,6 +164,7 @@ try:
             "quantity",
             "currency",
             "price",
+            "realized_pl",
             "created_date",
             "last_updated_date",
         ],
@@ -1,452 +1,321 @@
-from csv import QUOTE_NONE
-from datetime import datetime
-from typing import Optional
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional, Sequence
 
-import numpy as np
-import pandas as pd
 import requests
-import yfinance as yf
 from requests.exceptions import RequestException
-from yfinance.screener.screener import PREDEFINED_SCREENER_BODY_DEFAULTS
-
-SERVER_BASE_URL = "http://127.0.01:5000"
-
-
-class Portfolio:
-    def __init__(self) -> None:
-        """Initializes an empty Portfolio instance"""
-        pass
 
-    def _validate_date(self, date: Optional[str] = None) -> str:
+from client import REQUEST_TIMEOUT, SERVER_BASE_URL, PortfolioClient
+from fx import BASE_CURRENCY, get_fx_rates
+from lazyload import lazy_import
+from marketdata import download
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+risk = lazy_import("risk")
+optimizer = lazy_import("optimizer")
+backtest = lazy_import("backtest")
+pricestore = lazy_import("pricestore")
+correlation = lazy_import("correlation")
+whatif = lazy_import("whatif")
+
+# downloaded return matrices are reused for RETURNS_CACHE_TTL seconds
+RETURNS_CACHE_TTL = 60 * 60
+_returns_cache = {}
+_panel_locks = {}
+_panel_locks_lock = threading.Lock()
+
+
+def _cached_panel(name: str, build) -> pd.DataFrame:
+    """
+    Returns a panel from the process cache or the memory-mapped price store,
+    building and storing it only when both copies are older than RETURNS_CACHE_TTL.
+
+    Panels are served from the mapped files, so they are read-only zero-copy views and
+    every process on the host shares one copy in the page cache. Threads asking for
+    the same panel wait for a single download. Expired panels are dropped from the
+    process cache, and from the store after PRICE_STORE_MAX_AGE, as new ones are added.
+
+    Raises
+    ------
+    RuntimeError
+        If the panel cannot be read back from the store.
+    """
+    cached = _returns_cache.get(name)
+    if cached is not None and time.time() - cached[0] < RETURNS_CACHE_TTL:
+        return cached[1]
+    with _panel_locks_lock:
+        lock = _panel_locks.setdefault(name, threading.Lock())
+    with lock:
+        cached = _returns_cache.get(name)
+        if cached is not None and time.time() - cached[0] < RETURNS_CACHE_TTL:
+            return cached[1]
+        store = pricestore.PriceStore()
+        age = store.age(name)
+        if age is None or age >= RETURNS_CACHE_TTL:
+            store.write(name, build())
+            store.prune(pricestore.PRICE_STORE_MAX_AGE)
+            age = 0.0
+        panel = store.read(name)
+        if panel is None:
+            # the header was replaced or removed between write and read: rebuild once
+            store.write(name, build())
+            age = 0.0
+            panel = store.read(name)
+            if panel is None:
+                raise RuntimeError(f"Unable to read panel '{name}' from the price store.")
+        now = time.time()
+        for key, (fetched_at, _) in list(_returns_cache.items()):
+            if now - fetched_at >= RETURNS_CACHE_TTL:
+                _returns_cache.pop(key, None)
+        _returns_cache[name] = (now - age, panel)
+        return panel
+
+
+class Portfolio(PortfolioClient):
+    """
+    Portfolio client extended with analytics built on pandas, NumPy and yahoo! finance.
+
+    The analytics dependencies are imported on first use, so creating a Portfolio or
+    placing orders does not load them.
+    """
+
+    def __init__(
+        self, account: Optional[str] = None, base_currency: str = BASE_CURRENCY
+    ) -> None:
         """
-        Validate and process date
+        Initializes a Portfolio instance bound to an account.
 
         Parameters
         ----------
-        date : Optional[str]
-            The date string in 'YYYY-MM-DD' format. If not provided, uses today's date.
-
-        Returns
-        -------
-        str
-            A validated and properly formatted date string.
-
-        Raises
-        ------
-        ValueError
-            If the date format is incorrect or if the date is in the future.
+        account : Optional[str]
+            Name of the strategy account. Uses the server default account if not provided.
+        base_currency : str
+            Currency portfolio aggregates are expressed in. Defaults to 'USD'.
         """
-        if date is None:
-            return datetime.now().strftime("%Y-%m-%d")
-        try:
-            parsed_date = datetime.strptime(date, "%Y-%m-%d")
-        except ValueError:
-            raise ValueError(f"Invalid date format: {date}. Expected format: %Y-%m-%d")
-
-        if parsed_date > datetime.now():
-            raise ValueError(
-                f"Invalid date: future date provided: {date} > {datetime.now().strftime('%Y-%m-%d')}"
-            )
-        return date
+        super().__init__(account)
+        self.base_currency = base_currency.upper()
+        self.fx = get_fx_rates(self.base_currency)
 
-    def _get_lastest_price(self, ticker: str) -> float:
+    def _generate_orders_dataframe(self, include_archive: bool = False) -> pd.DataFrame:
         """
-        Retrieves the lates closing price of a specified asset using yahoo! finance.
+        Generates a pandas DataFrame containing order history.
 
         Parameters
         ----------
-        ticker : str
-            The ticker symbol of the asset.
+        include_archive : bool
+            Also include the orders moved to archive partitions.
 
         Returns
         -------
-        float
-            The most recent closing price.
-
-        Raises
-        ------
-        ValueError
-            If price data retrieval fails.
+        pd.DataFrame
+            DataFrame of order records
         """
-        try:
-            current_data = yf.Ticker(ticker).history(period="1d")
-            if current_data.empty:
-                raise ValueError(f"price fetch failed for '{ticker}'.")
-            price = current_data["Close"].iloc[-1]
-            return price
-        except Exception as err:
-            raise RuntimeError(f"Could not retrieve price for '{ticker}': {str(err)}")
+        return pd.DataFrame(self._fetch_orders_data(include_archive))
 
-    def _fetch_portfolio_data(self) -> dict:
+    def _generate_portfolio_dataframe(self) -> pd.DataFrame:
         """
-        Fetches the current portfolio data from the backend server.
+        Generates a pandas DataFrame containing current portfolio positions.
 
         Returns
         -------
-        dict
-            The portfolio data as JSON object.
-
-        Raises
-        ------
-        RequestException
-            If the server request fails.
+        pd.DataFrame
+            DataFrame of portfolio holdings.
         """
-        try:
-            response = requests.get(f"{SERVER_BASE_URL}/portfolio")
-            response.raise_for_status()
-            return response.json()
-        except RequestException as err:
-            raise RequestException(f"Failed to fetch portfolio data: {str(err)}")
+        return pd.DataFrame(
+            requests.get(f"{self.base_url}/portfolio", timeout=REQUEST_TIMEOUT).json()
+        )
 
-    def _fetch_orders_data(self) -> dict:
+    def _generate_base_portfolio_dataframe(self) -> pd.DataFrame:
         """
-        Fetches all order data from backend server.
+        Generates the portfolio positions DataFrame with amounts in the base currency.
+
+        Cost basis, market value and P&L are converted at spot rates with a single
+        vectorized join on the currency column.
 
         Returns
         -------
-        dict
-            The orders data as JSON object.
-
-        Raise
-        -----
-        RequestException
-            If the server request fails.
+        pd.DataFrame
+            DataFrame of portfolio holdings valued in the base currency.
         """
-        try:
-            response = requests.get(f"{SERVER_BASE_URL}/orders")
-            response.raise_for_status()
-            return response.json()
-        except RequestException as err:
-            raise RequestException(f"Failed to fetch orders data: {str(err)}")
+        return self.fx.convert(
+            self._generate_portfolio_dataframe(),
+            columns=["cost_basis", "market_value", "pl"],
+        )
 
-    def _post_to_server(self, endpoint: str, data: dict):
+    def _asset_returns(self, tickers: list, period: str, interval: str) -> pd.DataFrame:
         """
-        Internal helper to post JSON data to server and return the JSON sever response
+        Downloads the returns matrix of a set of assets, reusing the stored copy when
+        the same matrix was downloaded less than RETURNS_CACHE_TTL seconds ago.
 
         Parameters
         ----------
-        endpoint : str
-            The API endpoint.
-        data : dict
-            The JSON data to send.
+        tickers : list
+            Ticker symbols of the assets.
+        period : str
+            yahoo! finance download period, e.g. '10y'.
+        interval : str
+            yahoo! finance download interval, e.g. '1mo'.
 
         Returns
         -------
-        dict
-            The server's JSON response.
-
-        Raises
-        ------
-        RequestException
-            If the POST request fails.
+        pd.DataFrame
+            Returns indexed by date, one column per ticker (sorted by ticker).
         """
-        try:
-            url = f"{SERVER_BASE_URL}/{endpoint}"
-            response = requests.post(url, json=data)
-            response.raise_for_status()
-            print(f"server response: {response.json()}")
-            return response.json()
-        except RequestException as err:
-            raise RequestException(f"Failed to post data to '{endpoint}': {str(err)}")
+        tickers = sorted(tickers)
 
-    def buy_order(
-        self,
-        ticker: str,
-        quantity: int,
-        price: Optional[float] = None,
-        date: Optional[str] = None,
-        currency: str = "USD",
-    ) -> None:
+        def download() -> pd.DataFrame:
+            prices = download(tickers, period=period, interval=interval)["Close"]
+            if isinstance(prices, pd.Series):
+                prices = prices.to_frame(tickers[0])
+            return prices[tickers].pct_change(fill_method=None).dropna()
+
+        name = pricestore.PriceStore.panel_name("returns", tickers, period, interval)
+        return _cached_panel(name, download)
+
+    def _price_history(self, tickers: list, start: str) -> pd.DataFrame:
         """
-        Executes a buy order for a given asset and updates portfolio state.
+        Downloads daily closing prices from a start date, reusing the stored copy when
+        the same panel was downloaded less than RETURNS_CACHE_TTL seconds ago.
 
         Parameters
         ----------
-        ticker : str
-            The ticker symbol of the asset.
-        quantity : int
-            Number of contracts bought.
-        price : Optional[float]
-            Purchase price per contract. Fetched from yahoo! finance if not provided.
-        date : Optional[datetime]
-            Transaction date in 'YYYY-MM-DD' format. Defaults to current date if not provided.
-        currency : str
-            Currency of the transaction. Defaults to 'USD' (United States Dollar).
+        tickers : list
+            Ticker symbols of the assets.
+        start : str
+            First date in 'YYYY-MM-DD' format.
 
-        Raises
-        ------
-        ValueError
-            If parameters are invalid.
-        RequestException
-            If the server communication fails.
+        Returns
+        -------
+        pd.DataFrame
+            Closing prices indexed by date, one column per ticker (sorted by ticker).
         """
-        if not ticker:
-            raise ValueError("Buy order failed: ticker symbol must not be empty.")
-
-        if price is not None and price < 0:
-            raise ValueError(
-                f"Buy order failed: price must be a non-negative number: Received: {price}"
-            )
+        tickers = sorted(tickers)
 
-        if quantity <= 0:
-            raise ValueError(
-                f"Buy order failed: quantity must be a positive integer: Received: {quantity}"
-            )
-        transaction_date = self._validate_date(date)
-        created_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        if price is None:
-            price = self._get_lastest_price(ticker)
-
-        cost_basis = quantity * price
-
-        ticker = ticker.upper()
-        currency = currency.upper()
-        order_data = {
-            "ticker": ticker,
-            "order_type": "BUY",
-            "quantity": quantity,
-            "currency": currency,
-            "transaction_date": transaction_date,
-            "price": round(price, 3),
-            "transaction_value": round(cost_basis, 3),
-            "created_date": created_date,
-            "last_updated_date": created_date,
-        }
+        def download() -> pd.DataFrame:
+            prices = download(tickers, start=start, interval="1d")["Close"]
+            if isinstance(prices, pd.Series):
+                prices = prices.to_frame(tickers[0])
+            return prices[tickers]
 
-        try:
-            portfolio = self._fetch_portfolio_data()
-            existing_position = next(
-                (pos for pos in portfolio if pos["ticker"] == ticker), None
-            )
-            if existing_position:
-                new_quantity = existing_position["quantity"] + quantity
-                new_cost_basis = existing_position["cost_basis"] + cost_basis
-                new_avg_buy_price = new_cost_basis / new_quantity
-                market_price = self._get_lastest_price(ticker)
-                market_value = new_quantity * market_price
-                portfolio_data = {
-                    "ticker": ticker,
-                    "quantity": new_quantity,
-                    "currency": currency,
-                    "transaction_date": transaction_date,
-                    "avg_buy_price": round(new_avg_buy_price, 3),
-                    "cost_basis": round(new_cost_basis, 3),
-                    "market_price": round(market_price, 3),
-                    "market_value": round(market_value, 3),
-                    "pl": round(market_value - new_cost_basis, 3),
-                    "pl_pct": round(((market_value / new_cost_basis) - 1), 6),
-                    "created_date": existing_position["created_date"],
-                    "last_updated_date": created_date,
-                }
-            else:
-                portfolio_data = {
-                    "ticker": ticker,
-                    "quantity": quantity,
-                    "currency": currency,
-                    "transaction_date": transaction_date,
-                    "avg_buy_price": round(price, 3),
-                    "cost_basis": round(cost_basis, 3),
-                    "market_price": round(price, 3),
-                    "market_value": round(cost_basis, 3),
-                    "pl": 0.0,
-                    "pl_pct": 0.0,
-                    "created_date": created_date,
-                    "last_updated_date": created_date,
-                }
-
-            self._post_to_server("orders", data=order_data)
-            self._post_to_server("portfolio", data=portfolio_data)
-            print(
-                f"Buy order placed: {quantity} contracts of {ticker} at {price:.3f} {currency}"
-            )
-        except RequestException as err:
-            raise RequestException(
-                f"Buy order failed: unable to communicate with server: {str(err)}"
-            )
+        name = pricestore.PriceStore.panel_name("prices", tickers, start)
+        return _cached_panel(name, download)
 
-    def sell_order(
-        self,
-        ticker: str,
-        quantity: int,
-        price: Optional[float] = None,
-        date: Optional[str] = None,
-        currency: str = "USD",
-    ) -> None:
+    def _expected_returns_and_covariance(self, tickers: list) -> tuple:
         """
-        Executes a sell order for a given asset and updates the portfolio state.
+        Annualized expected returns and covariance of assets, estimated on ten years of
+        monthly returns.
 
         Parameters
         ----------
-        ticker : str
-            The ticker symbol of the asset.
-        quantity : int
-            Number of contracts sold.
-        price : Optional[float]
-            Sale price per contract. Fetched from yahoo! finance if not provided.
-        date : Optional[datetime]
-            Transaction date. Defaults to current date.
-        currency : str
-            Currency of the transaction. Defaults to 'USD' (United States Dollar).
+        tickers : list
+            Ticker symbols of the assets.
 
-        Raises
-        ------
-        ValueError
-            If parameters are invalid or the asset is not in the portfolio.
-        RequestException
-            If server communication fails.
+        Returns
+        -------
+        tuple
+            Expected returns (pd.Series) and covariance matrix (pd.DataFrame), both
+            ordered by ticker.
         """
-        if not ticker:
-            raise ValueError(f"Sell order failed: ticker symbol must not be empty.")
-
-        if price is not None and price < 0:
-            raise ValueError(
-                f"Sell order failed: price must be a non-negative number: Received: {price}"
-            )
-
-        if quantity <= 0:
-            raise ValueError(
-                f"Sell order failed: quantity must be a positive integer: Received: {quantity}"
-            )
-        transaction_date = self._validate_date(date)
-        created_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        if price is None:
-            price = self._get_lastest_price(ticker)
+        returns = self._asset_returns(tickers, "10y", "1mo")
+        return returns.mean() * 12, returns.cov() * 12
 
-        ticker = ticker.upper()
-        currency = currency.upper()
-
-        try:
-            portfolio = self._fetch_portfolio_data()
-            existing_position = next(
-                (pos for pos in portfolio if pos["ticker"] == ticker), None
-            )
-
-            if not existing_position:
-                raise ValueError(
-                    f"Sell order failed: no existing position found for ticker '{ticker}'"
-                )
-
-            # update existing position
-            new_quantity = existing_position["quantity"] - quantity
-            if new_quantity < 0:
-                raise ValueError(
-                    f"Sell order failed: attempting to sell more contracts than currently held ({quantity} > {existing_position['quantity']})."
-                )
-            cost_basis = quantity * existing_position["avg_buy_price"]
-            order_data = {
-                "ticker": ticker,
-                "order_type": "SELL",
-                "quantity": quantity,
-                "currency": currency,
-                "transaction_date": transaction_date,
-                "price": round(price, 3),
-                "transaction_value": round(price * quantity, 3),
-                "created_date": created_date,
-                "last_updated_date": created_date,
-            }
-            if new_quantity > 0:
-                new_cost_basis = existing_position["cost_basis"] - cost_basis
-                new_avg_buy_price = new_cost_basis / new_quantity
-                market_value = new_quantity * price
-                portfolio_data = {
-                    "ticker": ticker,
-                    "quantity": new_quantity,
-                    "currency": currency,
-                    "transaction_date": transaction_date,
-                    "avg_buy_price": round(new_avg_buy_price, 3),
-                    "cost_basis": round(new_cost_basis, 3),
-                    "market_price": round(price, 3),
-                    "market_value": round(market_value, 3),
-                    "pl": round(market_value - new_cost_basis, 3),
-                    "pl_pct": round(((market_value / new_cost_basis) - 1), 6),
-                    "created_date": existing_position["created_date"],
-                    "last_updated_date": created_date,
-                }
-            else:
-                portfolio_data = {
-                    "ticker": ticker,
-                    "quantity": new_quantity,
-                    "currency": currency,
-                    "transaction_date": transaction_date,
-                    "avg_buy_price": 0.0,
-                    "cost_basis": 0.0,
-                    "market_price": 0.0,
-                    "market_value": 0.0,
-                    "pl": 0.0,
-                    "pl_pct": 0.0,
-                    "created_date": existing_position["created_date"],
-                    "last_updated_date": created_date,
-                }
-
-            self._post_to_server("orders", data=order_data)
-            self._post_to_server("portfolio", data=portfolio_data)
-            print(
-                f"Sell order placed: {quantity} contracts of {ticker} at {price:.3f} {currency}"
-            )
-        except RequestException as err:
-            raise RequestException(
-                f"Sell order failed: unable to communicate with server: {str(err)}"
-            )
-
-    def update_portfolio_positions(self) -> None:
+    @staticmethod
+    def accounts_summary() -> pd.DataFrame:
         """
-        Updates all assets in the portfolio with the lastest market price, recalculating market value, P&L and P&L percentage.
+        Retrieves position totals of every account, grouped by currency.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with one row per account and currency.
 
         Raises
         ------
         RequestException
-            If server communication fails.
+            If the server request fails.
         """
-        last_updated_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
-            portfolio = self._fetch_portfolio_data()
-            for position in portfolio:
-                ticker = position["ticker"]
-                market_price = self._get_lastest_price(ticker)
-                market_value = position["quantity"] * market_price
-                portfolio_data = {
-                    "ticker": ticker,
-                    "quantity": position["quantity"],
-                    "currency": position["currency"],
-                    "transaction_date": position["transaction_date"],
-                    "avg_buy_price": position["avg_buy_price"],
-                    "cost_basis": position["cost_basis"],
-                    "market_price": round(market_price, 3),
-                    "market_value": round(market_value, 3),
-                    "pl": round(market_value - position["cost_basis"], 3),
-                    "pl_pct": round(((market_value / position["cost_basis"]) - 1), 6),
-                    "created_date": position["created_date"],
-                    "last_updated_date": last_updated_date,
-                }
-                self._post_to_server("portfolio", data=portfolio_data)
-        except RequestException as err:
-            raise RequestException(
-                f"Portfolio update failed: unable to communicate with server: {str(err)}"
+            response = requests.get(
+                f"{SERVER_BASE_URL}/accounts/summary", timeout=REQUEST_TIMEOUT
             )
+            response.raise_for_status()
+        except RequestException as err:
+            raise RequestException(f"Failed to fetch accounts summary: {str(err)}")
+        rows = [
+            {"account": account, **row}
+            for account, totals in response.json().items()
+            for row in totals
+        ]
+        return pd.DataFrame(
+            rows,
+            columns=[
+                "account",
+                "currency",
+                "positions",
+                "cost_basis",
+                "market_value",
+                "pl",
+            ],
+        )
 
-    def _generate_orders_dataframe(self) -> pd.DataFrame:
+    def _portfolio_summary(self, weights: bool = False) -> dict:
         """
-        Generates a pandas DataFrame containing order history.
+        Retrieves the portfolio totals aggregated by the server, one row per currency.
+
+        Parameters
+        ----------
+        weights : bool
+            Also retrieve the weight of each position within its currency.
 
         Returns
         -------
-        pd.DataFrame
-            DataFrame of order records
+        dict
+            'totals' by currency and, if requested, 'weights' by ticker.
+
+        Raises
+        ------
+        RequestException
+            If the server request fails.
         """
-        return pd.DataFrame(requests.get(f"{SERVER_BASE_URL}/orders").json())
+        params = {"weights": 1} if weights else None
+        try:
+            response = requests.get(
+                f"{self.base_url}/portfolio/summary",
+                params=params,
+                timeout=REQUEST_TIMEOUT,
+            )
+            response.raise_for_status()
+        except RequestException as err:
+            raise RequestException(f"Failed to fetch portfolio summary: {str(err)}")
+        return response.json()
 
-    def _generate_portfolio_dataframe(self) -> pd.DataFrame:
+    def _base_currency_totals(self, summary: dict) -> pd.DataFrame:
         """
-        Generates a pandas DataFrame containing current portfolio positions.
+        Converts the per-currency totals of a portfolio summary to the base currency.
 
         Returns
         -------
         pd.DataFrame
-            DataFrame of portfolio holdings.
-        """
-        return pd.DataFrame(requests.get(f"{SERVER_BASE_URL}/portfolio").json())
+            One row per currency with cost basis, market value, P&L and market value
+            weighted P&L percentage in the base currency.
+        """
+        totals = pd.DataFrame(
+            summary["totals"],
+            columns=[
+                "currency",
+                "positions",
+                "cost_basis",
+                "market_value",
+                "pl",
+                "weighted_pl_pct",
+            ],
+        )
+        return self.fx.convert(
+            totals, columns=["cost_basis", "market_value", "pl", "weighted_pl_pct"]
+        )
 
     def total_cost_basis(self) -> float:
         """
@@ -455,9 +324,9 @@ class Portfolio:
         Returns
         -------
         float
-            Sum of cost basis for all assets.
+            Sum of cost basis for all assets, in the base currency.
         """
-        return self._generate_portfolio_dataframe()["cost_basis"].sum()
+        return self._base_currency_totals(self._portfolio_summary())["cost_basis"].sum()
 
     def total_market_value(self) -> float:
         """
@@ -466,9 +335,9 @@ class Portfolio:
         Returns
         -------
         float
-            Market value of all assets combined.
+            Market value of all assets combined, in the base currency.
         """
-        return self._generate_portfolio_dataframe()["market_value"].sum()
+        return self._base_currency_totals(self._portfolio_summary())["market_value"].sum()
 
     def total_pl(self) -> float:
         """
@@ -477,9 +346,41 @@ class Portfolio:
         Returns
         -------
         float
-            Net gain or loss across all holdings.
+            Net gain or loss across all holdings, in the base currency.
         """
-        return self._generate_portfolio_dataframe()["pl"].sum()
+        return self._base_currency_totals(self._portfolio_summary())["pl"].sum()
+
+    def realized_pl(self, year: Optional[int] = None) -> float:
+        """
+        Retrieves the P&L realized by sell orders during a year.
+
+        Parameters
+        ----------
+        year : Optional[int]
+            Calendar year. Defaults to the current year.
+
+        Returns
+        -------
+        float
+            Realized P&L in the base currency.
+
+        Raises
+        ------
+        RequestException
+            If the server request fails.
+        """
+        params = {"year": year} if year is not None else None
+        try:
+            response = requests.get(
+                f"{self.base_url}/realized_pl", params=params, timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+        except RequestException as err:
+            raise RequestException(f"Failed to fetch realized P&L: {str(err)}")
+        by_currency = pd.DataFrame(
+            response.json()["realized_pl"], columns=["currency", "realized_pl"]
+        )
+        return self.fx.convert(by_currency, columns=["realized_pl"])["realized_pl"].sum()
 
     def assets_weights(self) -> pd.DataFrame:
         """
@@ -490,10 +391,13 @@ class Portfolio:
         pd.DataFrame
             DataFrame with tickers and their respective weights in the portfolio.
         """
-        df = self._generate_portfolio_dataframe()
-        total_value = self.total_market_value()
-        weights = round(df["market_value"] / total_value, 3)
-        return pd.DataFrame({"ticker": df["ticker"], "weight": weights})
+        summary = self._portfolio_summary(weights=True)
+        totals = self._base_currency_totals(summary).set_index("currency")
+        # a position's weight is its weight within its currency times that currency's share
+        currency_share = totals["market_value"] / totals["market_value"].sum()
+        df = pd.DataFrame(summary["weights"], columns=["ticker", "currency", "weight"])
+        weights = df["weight"] * df["currency"].map(currency_share)
+        return pd.DataFrame({"ticker": df["ticker"], "weight": round(weights, 3)})
 
     def portfolio_return(self) -> float:
         """
@@ -504,10 +408,11 @@ class Portfolio:
         float
             Portfolio return as a weighted average of individual asset returns.
         """
-        df = self._generate_portfolio_dataframe()
-        weights = self.assets_weights()
-        merged = df.merge(weights, on="ticker")
-        return round(sum(merged["pl_pct"] * merged["weight"]), 3)
+        totals = self._base_currency_totals(self._portfolio_summary())
+        market_value = totals["market_value"].sum()
+        if market_value == 0:
+            return 0.0
+        return round(totals["weighted_pl_pct"].sum() / market_value, 3)
 
     def annualized_portfolio_volatility(self) -> float:
         """
@@ -518,56 +423,119 @@ class Portfolio:
         float
             Annualized standard deviation of portfolio returns.
         """
-        df = self._generate_portfolio_dataframe()
-        weights = self.assets_weights()
-        tickers = df["ticker"].to_list()
-        returns = (
-            yf.download(tickers, period="10y", interval="1mo", progress=False)["Close"]
-            .pct_change(fill_method=None)
-            .dropna()
+        weights = self.assets_weights().set_index("ticker")["weight"]
+        _, cov_matrix = self._expected_returns_and_covariance(weights.index.tolist())
+        weights = weights[cov_matrix.columns]
+        vol = np.sqrt(np.dot(weights, np.dot(cov_matrix, weights)))
+        return round(vol, 3)
+
+    def what_if_engine(self) -> whatif.WhatIfEngine:
+        """
+        Builds the pre-trade impact engine of the current book.
+
+        The covariance comes from the cached return matrix, so building the engine
+        after the dashboard has loaded does not download prices again.
+
+        Returns
+        -------
+        whatif.WhatIfEngine
+            Engine previewing the effect of an order on weights and volatility.
+
+        Raises
+        ------
+        ValueError
+            If the portfolio holds no position.
+        """
+        positions = self._generate_base_portfolio_dataframe()
+        if positions.empty:
+            raise ValueError("The portfolio holds no position to compare the trade with.")
+        positions = positions.set_index("ticker")
+        _, cov_matrix = self._expected_returns_and_covariance(positions.index.tolist())
+        return whatif.WhatIfEngine(
+            cov_matrix,
+            positions["market_value"],
+            prices=positions["market_price"] * positions["fx_rate"],
         )
-        cov_matrix = returns.cov()
-        vol = np.sqrt(np.dot(weights["weight"], np.dot(cov_matrix, weights["weight"])))
-        return round(vol * np.sqrt(12), 3)
 
     def assets_correlation(self) -> pd.DataFrame:
         """
         Calculate correlation between assets in the portfolio
 
+        The matrix is computed in float32 blocks and ordered by hierarchical
+        clustering, so correlated assets are adjacent. Use correlation.select_assets()
+        to display a bounded subset of a large universe.
+
         Returns
         -------
         pd.DataFrame
-            Correlation matrix of asset returns
+            Correlation matrix of asset returns, in cluster order
         """
         tickers = self._generate_portfolio_dataframe()["ticker"].tolist()
-        returns = (
-            yf.download(tickers, period="10y", interval="1mo", progress=False)["Close"]
-            .pct_change(fill_method=None)
-            .dropna()
-        )
-        return returns.corr()
+        returns = self._asset_returns(tickers, "10y", "1mo")
+        return correlation.clustered(correlation.correlation_matrix(returns))
+
+    def portfolio_backtest(self) -> pd.DataFrame:
+        """
+        Replays the order ledger over daily prices since the first order.
+
+        Prices and trade prices are converted to the base currency at each day's FX
+        rate before the replay.
+
+        Returns
+        -------
+        pd.DataFrame
+            Daily NAV, cash flows, time-weighted returns and drawdowns.
+
+        Raises
+        ------
+        ValueError
+            If no orders have been recorded.
+        """
+        orders = self._generate_orders_dataframe(include_archive=True)
+        if orders.empty:
+            raise ValueError("No orders recorded: nothing to backtest.")
+        orders["currency"] = orders["currency"].str.upper()
+        tickers = sorted(orders["ticker"].unique())
+        prices = self._price_history(tickers, orders["transaction_date"].min())
+        currency = orders.groupby("ticker")["currency"].last()
+        fx_history = self.fx.history(currency.unique(), prices.index)
+        prices = prices * fx_history[currency[prices.columns]].to_numpy()
+        day = prices.index.searchsorted(pd.to_datetime(orders["transaction_date"]))
+        day = day.clip(0, len(prices) - 1)
+        order_rates = fx_history.to_numpy()[
+            day, fx_history.columns.get_indexer(orders["currency"])
+        ]
+        orders["price"] = orders["price"] * order_rates
+        return backtest.backtest(orders, prices)
+
+    def portfolio_backtest_summary(self) -> pd.DataFrame:
+        """
+        Summarizes the backtest of the order ledger.
+
+        Returns
+        -------
+        pd.DataFrame
+            Time-weighted and money-weighted returns, volatility and maximum drawdown.
+        """
+        return backtest.backtest_summary(self.portfolio_backtest())
 
     def portfolio_cumulative_return(self) -> pd.Series:
         """
-        Calculate cumulative returns of the portfolio over the past year.
+        Calculate time-weighted cumulative returns of the portfolio since the start of
+        the year, replaying the holdings actually held on each day.
 
         Returns
         -------
         pd.Series
             Time series of cumulative returns.
         """
-        df = self._generate_portfolio_dataframe()
-        tickers = df["ticker"].tolist()
-        weights = self.assets_weights().set_index("ticker")["weight"]
-        returns = (
-            yf.download(tickers, period="ytd", interval="1d", progress=False)["Close"]
-            .pct_change(fill_method=None)
-            .dropna()
-        )
-        weighted_returns = weights * returns
-        portfolio_returns = weighted_returns.sum(axis=1)
-        cumulative_returns = (1 + portfolio_returns).cumprod() - 1
-        return cumulative_returns
+        result = self.portfolio_backtest()
+        wealth = 1 + result["cumulative_return"]
+        year_start = pd.Timestamp(pd.Timestamp.now().year, 1, 1)
+        before = wealth[wealth.index < year_start]
+        base = before.iloc[-1] if not before.empty else 1.0
+        cumulative_returns = wealth[wealth.index >= year_start] / base - 1
+        return cumulative_returns.rename_axis("Date")
 
     def portfolio_stats(self) -> pd.DataFrame:
         """
@@ -580,10 +548,15 @@ class Portfolio:
         """
         df = self._generate_portfolio_dataframe()
         tickers = df["ticker"].tolist()
-        quantity = df[["ticker", "quantity"]]
-        df = yf.download(tickers, period="1y", interval="1d", progress=False)["Close"]
-        for t in quantity["ticker"]:
-            df[t] = df[t] * quantity.loc[quantity["ticker"] == t, "quantity"].values[0]
+        quantity = df.set_index("ticker")["quantity"]
+        currency = df.set_index("ticker")["currency"].str.upper()
+        df = download(tickers, period="1y", interval="1d")["Close"]
+        if isinstance(df, pd.Series):
+            df = df.to_frame(tickers[0])
+        # value each day's holdings in the base currency at that day's FX rate
+        fx_history = self.fx.history(currency.unique(), df.index)
+        fx_rates = fx_history[currency[df.columns]].to_numpy()
+        df = df * quantity[df.columns].to_numpy() * fx_rates
         df = df.dropna()
         df = df.sum(axis=1)
         result_df = pd.DataFrame(
@@ -591,6 +564,7 @@ class Portfolio:
                 "portfolio cost basis": [self.total_cost_basis()],
                 "portfolio market value": [self.total_market_value()],
                 "portfolio P&L": [self.total_pl()],
+                "realized P&L (YTD)": [self.realized_pl()],
                 "portfolio return (%)": [self.portfolio_return() * 100],
                 "portfolio ann. volatility (%)": [
                     self.annualized_portfolio_volatility() * 100
@@ -602,3 +576,156 @@ class Portfolio:
         result_df = round(result_df.T, 3)
         result_df.columns = ["stats"]
         return result_df
+
+    def portfolio_risk(
+        self,
+        n_scenarios: int = 100_000,
+        levels: Sequence[float] = (0.95, 0.99),
+        horizons: Sequence[int] = (1, 10),
+        method: str = "parametric",
+    ) -> pd.DataFrame:
+        """
+        Estimates portfolio value at risk and expected shortfall by Monte Carlo
+        simulation on one year of daily asset returns.
+
+        Parameters
+        ----------
+        n_scenarios : int
+            Number of simulated scenarios.
+        levels : Sequence[float]
+            Confidence levels.
+        horizons : Sequence[int]
+            Horizons in trading days.
+        method : str
+            'parametric' (correlated normal returns) or 'historical' (bootstrap).
+
+        Returns
+        -------
+        pd.DataFrame
+            VaR and CVaR per horizon and confidence level, in percent and in the base
+            currency.
+        """
+        df = self._generate_base_portfolio_dataframe()
+        total_value = df["market_value"].sum()
+        weights = df.set_index("ticker")["market_value"] / total_value
+        returns = self._asset_returns(weights.index.tolist(), "1y", "1d")
+        return risk.risk_report(
+            weights[returns.columns].to_numpy(),
+            returns.to_numpy(),
+            portfolio_value=total_value,
+            n_scenarios=n_scenarios,
+            levels=levels,
+            horizons=horizons,
+            method=method,
+        )
+
+    def portfolio_optimizer(
+        self, max_weight: float = 1.0, long_only: bool = True
+    ) -> optimizer.MeanVarianceOptimizer:
+        """
+        Builds a mean-variance optimizer over the assets currently held, on the same
+        ten years of monthly returns used for the portfolio volatility.
+
+        The covariance is shrunk towards a scaled identity (Ledoit-Wolf), since the 120
+        monthly observations make the sample covariance singular beyond 120 assets.
+
+        Parameters
+        ----------
+        max_weight : float
+            Maximum weight of a single asset.
+        long_only : bool
+            Forbids short positions.
+
+        Returns
+        -------
+        optimizer.MeanVarianceOptimizer
+            Optimizer over the portfolio assets.
+        """
+        tickers = self._generate_portfolio_dataframe()["ticker"].tolist()
+        returns = self._asset_returns(tickers, "10y", "1mo")
+        mean, cov = returns.mean() * 12, optimizer.shrink_covariance(returns) * 12
+        return optimizer.MeanVarianceOptimizer(
+            mean.to_numpy(),
+            cov.to_numpy(),
+            tickers=mean.index.tolist(),
+            max_weight=max_weight,
+            long_only=long_only,
+        )
+
+    def efficient_frontier(
+        self, n_points: int = 50, max_weight: float = 1.0, long_only: bool = True
+    ) -> pd.DataFrame:
+        """
+        Traces the efficient frontier of the assets currently held.
+
+        Parameters
+        ----------
+        n_points : int
+            Number of frontier portfolios.
+        max_weight : float
+            Maximum weight of a single asset.
+        long_only : bool
+            Forbids short positions.
+
+        Returns
+        -------
+        pd.DataFrame
+            Annualized expected return, volatility, Sharpe ratio and weights of each
+            frontier portfolio.
+        """
+        return self.portfolio_optimizer(max_weight, long_only).efficient_frontier(
+            n_points
+        )
+
+    def optimal_weights(
+        self,
+        objective: str = "max_sharpe",
+        target_return: Optional[float] = None,
+        max_weight: float = 1.0,
+        long_only: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Computes optimal weights and compares them with the current allocation.
+
+        Parameters
+        ----------
+        objective : str
+            'max_sharpe', 'min_variance' or 'target_return'.
+        target_return : Optional[float]
+            Annualized target return, required by the 'target_return' objective.
+        max_weight : float
+            Maximum weight of a single asset.
+        long_only : bool
+            Forbids short positions.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with tickers, current weights, optimal weights and the change.
+
+        Raises
+        ------
+        ValueError
+            If the objective is unknown or the target return is missing.
+        """
+        opt = self.portfolio_optimizer(max_weight, long_only)
+        if objective == "max_sharpe":
+            weights = opt.max_sharpe()
+        elif objective == "min_variance":
+            weights = opt.min_variance()
+        elif objective == "target_return":
+            if target_return is None:
+                raise ValueError("The 'target_return' objective requires a target return.")
+            weights = opt.target_return(target_return)
+        else:
+            raise ValueError(f"Unknown optimization objective: '{objective}'.")
+        current = self.assets_weights().set_index("ticker")["weight"]
+        result = pd.DataFrame(
+            {
+                "ticker": weights.index,
+                "current weight": current.reindex(weights.index).fillna(0.0).to_numpy(),
+                "optimal weight": weights.round(3).to_numpy(),
+            }
+        )
+        result["change"] = result["optimal weight"] - result["current weight"]
+        return result
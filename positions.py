@@ -0,0 +1,118 @@
+import json
+import sqlite3
+import threading
+
+PORTFOLIO_COLUMNS = (
+    "ticker",
+    "quantity",
+    "currency",
+    "transaction_date",
+    "avg_buy_price",
+    "cost_basis",
+    "market_price",
+    "market_value",
+    "pl",
+    "pl_pct",
+    "created_date",
+    "last_updated_date",
+)
+
+
+class Position:
+    """A portfolio position, stored in slots rather than a per-instance dict."""
+
+    __slots__ = PORTFOLIO_COLUMNS
+
+    def __init__(self, *values) -> None:
+        for column, value in zip(PORTFOLIO_COLUMNS, values):
+            setattr(self, column, value)
+
+    def to_dict(self) -> dict:
+        return {column: getattr(self, column) for column in PORTFOLIO_COLUMNS}
+
+
+class PositionStore:
+    """
+    In-memory copy of the portfolio table of a database, indexed by ticker.
+
+    Reads are served from memory and the JSON body of the full portfolio is serialized
+    once per change, so a refresh costs a dictionary lookup regardless of how many
+    dashboard sessions poll the server. Writes update the store and go through to
+    SQLite; if a write fails the caller must drain the queued writes and call reload().
+    """
+
+    def __init__(self, database: str) -> None:
+        """
+        Parameters
+        ----------
+        database : str
+            Path of the SQLite database holding the portfolio table.
+        """
+        self.database = database
+        self.lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        """Loads the positions from the database."""
+        with sqlite3.connect(self.database) as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(PORTFOLIO_COLUMNS)} FROM portfolio"
+            ).fetchall()
+        self._positions = {row[0]: Position(*row) for row in rows}
+        self._payload = None
+
+    def upsert(self, data: dict) -> None:
+        """
+        Creates or replaces a position.
+
+        Parameters
+        ----------
+        data : dict
+            Position fields, keyed by portfolio column.
+        """
+        self._positions[data["ticker"]] = Position(
+            *(data[column] for column in PORTFOLIO_COLUMNS)
+        )
+        self._payload = None
+
+    def remove(self, ticker: str) -> None:
+        """
+        Removes a position, if present.
+
+        Parameters
+        ----------
+        ticker : str
+            Ticker symbol of the position.
+        """
+        if self._positions.pop(ticker, None) is not None:
+            self._payload = None
+
+    def get(self, ticker: str):
+        """
+        Returns a position by ticker.
+
+        Returns
+        -------
+        Optional[Position]
+            The position, or None if the ticker is not held.
+        """
+        return self._positions.get(ticker)
+
+    def payload(self) -> bytes:
+        """
+        Returns the JSON body listing every position, serialized once per change.
+
+        Returns
+        -------
+        bytes
+            UTF-8 encoded JSON array of positions.
+        """
+        payload = self._payload
+        if payload is None:
+            with self.lock:
+                if self._payload is None:
+                    self._payload = json.dumps(
+                        [p.to_dict() for p in self._positions.values()]
+                    ).encode()
+                payload = self._payload
+        return payload
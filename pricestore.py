@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+PRICE_STORE_DIR = "price_store"
+# panels not rewritten for PRICE_STORE_MAX_AGE seconds (e.g. of a former set of
+# tickers) are removed from the store
+PRICE_STORE_MAX_AGE = 24 * 60 * 60
+
+
+class PriceStore:
+    """
+    Columnar on-disk store of price panels, opened with numpy.memmap.
+
+    A panel is written as three files:
+
+    - <name>.<generation>.f64: float64 values, one contiguous row per ticker
+    - <name>.<generation>.idx: int64 dates, nanoseconds since the epoch
+    - <name>.json: tickers, axis names, number of dates, write time and current
+      generation
+
+    Reading maps the files instead of parsing them, so a panel loads as a zero-copy
+    view and every process reading the same panel shares the OS page cache instead of
+    holding its own copy. Each write creates a new generation and then swaps the
+    header, so readers never see a header and arrays from different writes.
+    """
+
+    def __init__(self, directory: str = PRICE_STORE_DIR) -> None:
+        """
+        Parameters
+        ----------
+        directory : str
+            Directory holding the panel files.
+        """
+        self.directory = directory
+
+    @staticmethod
+    def panel_name(kind: str, tickers: list, *params: str) -> str:
+        """
+        Builds a file name identifying a panel.
+
+        Parameters
+        ----------
+        kind : str
+            Panel kind, e.g. 'prices' or 'returns'.
+        tickers : list
+            Ticker symbols of the panel columns.
+        params : str
+            Download parameters (period, interval, start date...).
+
+        Returns
+        -------
+        str
+            A name safe to use as a file name.
+        """
+        digest = hashlib.sha1(",".join(sorted(tickers)).encode()).hexdigest()[:16]
+        return "_".join([kind, *params, digest]).replace("/", "-")
+
+    def _path(self, name: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{name}.{extension}")
+
+    def write(self, name: str, panel: pd.DataFrame) -> None:
+        """
+        Writes a panel, replacing any previous version atomically.
+
+        Parameters
+        ----------
+        name : str
+            Panel name.
+        panel : pd.DataFrame
+            Values indexed by date, one column per ticker.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        values = np.ascontiguousarray(panel.to_numpy(dtype=np.float64).T)
+        dates = pd.DatetimeIndex(panel.index).tz_localize(None).as_unit("ns")
+        generation = f"{time.time_ns()}-{os.getpid()}-{threading.get_ident()}"
+        values.tofile(self._path(f"{name}.{generation}", "f64"))
+        dates.asi8.astype(np.int64).tofile(self._path(f"{name}.{generation}", "idx"))
+        previous = self._meta(name)
+        meta = {
+            "tickers": [str(t) for t in panel.columns],
+            "columns_name": panel.columns.name,
+            "index_name": panel.index.name,
+            "n_dates": len(panel.index),
+            "written_at": time.time(),
+            "generation": generation,
+        }
+        tmp = self._path(f"{name}.{generation}", "json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(name, "json"))
+        if previous is not None:
+            # readers still mapping the old generation keep their pages until they unmap
+            for extension in ("f64", "idx"):
+                try:
+                    os.remove(self._path(f"{name}.{previous['generation']}", extension))
+                except OSError:
+                    pass
+
+    def _meta(self, name: str) -> Optional[dict]:
+        try:
+            with open(self._path(name, "json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def age(self, name: str) -> Optional[float]:
+        """
+        Returns the age of a panel in seconds, or None if it is not stored.
+        """
+        meta = self._meta(name)
+        return time.time() - meta["written_at"] if meta is not None else None
+
+    def prune(self, max_age: float) -> list:
+        """
+        Removes the panels written more than max_age seconds ago.
+
+        Readers still mapping a removed panel keep their pages until they unmap.
+
+        Parameters
+        ----------
+        max_age : float
+            Age in seconds beyond which a panel is removed.
+
+        Returns
+        -------
+        list
+            Names of the removed panels.
+        """
+        try:
+            headers = [f for f in os.listdir(self.directory) if f.endswith(".json")]
+        except OSError:
+            return []
+        removed = []
+        for header in headers:
+            name = header[: -len(".json")]
+            meta = self._meta(name)
+            if meta is None or time.time() - meta["written_at"] < max_age:
+                continue
+            for path in (
+                self._path(name, "json"),
+                self._path(f"{name}.{meta['generation']}", "f64"),
+                self._path(f"{name}.{meta['generation']}", "idx"),
+            ):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            removed.append(name)
+        return removed
+
+    def read(self, name: str) -> Optional[pd.DataFrame]:
+        """
+        Maps a stored panel into memory.
+
+        Parameters
+        ----------
+        name : str
+            Panel name.
+
+        Returns
+        -------
+        Optional[pd.DataFrame]
+            Read-only panel backed by the mapped file, or None if it is not stored.
+        """
+        for _ in range(3):
+            meta = self._meta(name)
+            if meta is None:
+                return None
+            n_tickers, n_dates = len(meta["tickers"]), meta["n_dates"]
+            columns = pd.Index(meta["tickers"], name=meta.get("columns_name"))
+            index_name = meta.get("index_name", "Date")
+            if n_tickers == 0 or n_dates == 0:
+                return pd.DataFrame(
+                    index=pd.DatetimeIndex([], name=index_name),
+                    columns=columns,
+                    dtype=float,
+                )
+            path = f"{name}.{meta['generation']}"
+            try:
+                values = np.memmap(
+                    self._path(path, "f64"),
+                    dtype=np.float64,
+                    mode="r",
+                    shape=(n_tickers, n_dates),
+                )
+                dates = np.memmap(
+                    self._path(path, "idx"), dtype=np.int64, mode="r", shape=(n_dates,)
+                )
+                break
+            except FileNotFoundError:
+                # replaced by a concurrent write between reading the header and mapping
+                continue
+        else:
+            return None
+        index = pd.DatetimeIndex(dates.view("datetime64[ns]"), name=index_name)
+        # the transpose of a (ticker x date) row-major array is a column-major
+        # (date x ticker) view, which pandas stores as-is
+        return pd.DataFrame(values.T, index=index, columns=columns, copy=False)
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CONFIDENCE_LEVELS = (0.95, 0.99)
+DEFAULT_HORIZONS = (1, 10)
+
+# simulations larger than POOL_THRESHOLD scenarios are split across a process pool
+POOL_THRESHOLD = 200_000
+# scenarios generated per NumPy batch, bounds the memory of a single draw
+CHUNK_SIZE = 50_000
+
+
+def _cholesky(cov: np.ndarray) -> np.ndarray:
+    """
+    Cholesky factor of a covariance matrix, adding jitter to the diagonal when the
+    sample covariance is only positive semi-definite.
+    """
+    jitter = 0.0
+    scale = np.mean(np.diag(cov)) or 1.0
+    for _ in range(10):
+        try:
+            return np.linalg.cholesky(cov + jitter * np.eye(len(cov)))
+        except np.linalg.LinAlgError:
+            jitter = scale * 1e-10 if jitter == 0 else jitter * 10
+    raise ValueError("Covariance matrix is not positive semi-definite.")
+
+
+def _parametric_chunk(args: tuple) -> np.ndarray:
+    """
+    Draws one-period portfolio shocks from correlated normal asset returns.
+
+    Asset returns are L @ z with L the Cholesky factor of the covariance, so the
+    portfolio shock w' L z is computed as z @ (L' w): one matrix-vector product per
+    batch instead of materializing the correlated asset draws.
+    """
+    loadings, n, seed = args
+    rng = np.random.default_rng(seed)
+    out = np.empty(n)
+    for start in range(0, n, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, n - start)
+        z = rng.standard_normal((size, len(loadings)), dtype=np.float32)
+        out[start : start + size] = z @ loadings
+    return out
+
+
+def _historical_chunk(args: tuple) -> np.ndarray:
+    """
+    Bootstraps horizon returns by summing randomly drawn historical portfolio returns.
+    """
+    portfolio_returns, horizon, n, seed = args
+    rng = np.random.default_rng(seed)
+    out = np.empty(n)
+    for start in range(0, n, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, n - start)
+        idx = rng.integers(0, len(portfolio_returns), size=(size, horizon))
+        out[start : start + size] = portfolio_returns[idx].sum(axis=1)
+    return out
+
+
+def _run(
+    worker, payload: tuple, n_scenarios: int, seed: Optional[int], workers: Optional[int]
+) -> np.ndarray:
+    """
+    Runs a simulation worker, splitting large scenario counts across processes.
+
+    Every part gets an independent random stream spawned from the same seed.
+    """
+    if workers is None:
+        workers = (os.cpu_count() or 1) if n_scenarios > POOL_THRESHOLD else 1
+    workers = max(1, min(workers, n_scenarios))
+    sizes = [n_scenarios // workers + (i < n_scenarios % workers) for i in range(workers)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    tasks = [(*payload, size, s) for size, s in zip(sizes, seeds)]
+    if workers == 1:
+        return worker(tasks[0])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(worker, tasks)))
+
+
+def simulate_portfolio_returns(
+    weights: np.ndarray,
+    returns: Optional[np.ndarray] = None,
+    mean: Optional[np.ndarray] = None,
+    cov: Optional[np.ndarray] = None,
+    n_scenarios: int = 100_000,
+    horizon: int = 1,
+    method: str = "parametric",
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Simulates portfolio returns over a horizon.
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        Portfolio weights, one per asset.
+    returns : Optional[np.ndarray]
+        Historical returns matrix (periods x assets). Required by the historical
+        method, and used to fit mean and covariance when they are not provided.
+    mean : Optional[np.ndarray]
+        Expected one-period asset returns for the parametric method.
+    cov : Optional[np.ndarray]
+        One-period asset return covariance for the parametric method.
+    n_scenarios : int
+        Number of simulated scenarios.
+    horizon : int
+        Horizon in periods of the returns matrix.
+    method : str
+        'parametric' draws correlated normal returns through the Cholesky factor of
+        the covariance; 'historical' bootstraps periods of the returns matrix.
+    seed : Optional[int]
+        Seed of the random generator.
+    workers : Optional[int]
+        Number of processes. Defaults to all CPUs above POOL_THRESHOLD scenarios.
+
+    Returns
+    -------
+    np.ndarray
+        Simulated portfolio returns over the horizon.
+
+    Raises
+    ------
+    ValueError
+        If the inputs required by the method are missing or invalid.
+    """
+    weights = np.asarray(weights, dtype=float)
+    if n_scenarios <= 0 or horizon <= 0:
+        raise ValueError("Scenario count and horizon must be positive integers.")
+
+    if method == "historical":
+        if returns is None:
+            raise ValueError("The historical method requires a returns matrix.")
+        portfolio_returns = np.asarray(returns, dtype=float) @ weights
+        return _run(
+            _historical_chunk, (portfolio_returns, horizon), n_scenarios, seed, workers
+        )
+
+    if method != "parametric":
+        raise ValueError(f"Unknown simulation method: '{method}'.")
+    if mean is None or cov is None:
+        if returns is None:
+            raise ValueError("The parametric method requires mean and covariance or a returns matrix.")
+        returns = np.asarray(returns, dtype=float)
+        mean = returns.mean(axis=0) if mean is None else mean
+        cov = np.cov(returns, rowvar=False) if cov is None else cov
+    cov = np.atleast_2d(np.asarray(cov, dtype=float))
+    loadings = (_cholesky(cov).T @ weights).astype(np.float32)
+    shocks = _run(_parametric_chunk, (loadings,), n_scenarios, seed, workers)
+    # i.i.d. returns: the mean scales with the horizon, the shock with its square root
+    return float(np.dot(mean, weights)) * horizon + np.sqrt(horizon) * shocks
+
+
+def var_cvar(simulated: np.ndarray, level: float) -> tuple:
+    """
+    Computes value at risk and expected shortfall of simulated returns.
+
+    Parameters
+    ----------
+    simulated : np.ndarray
+        Simulated portfolio returns.
+    level : float
+        Confidence level, e.g. 0.99.
+
+    Returns
+    -------
+    tuple
+        VaR and CVaR expressed as positive losses (fractions of portfolio value).
+    """
+    threshold = np.quantile(simulated, 1 - level)
+    tail = simulated[simulated <= threshold]
+    return -threshold, -tail.mean()
+
+
+def risk_report(
+    weights: np.ndarray,
+    returns: np.ndarray,
+    portfolio_value: float = 1.0,
+    n_scenarios: int = 100_000,
+    levels: Sequence[float] = DEFAULT_CONFIDENCE_LEVELS,
+    horizons: Sequence[int] = DEFAULT_HORIZONS,
+    method: str = "parametric",
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Computes VaR and CVaR at several confidence levels and horizons.
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        Portfolio weights, one per asset.
+    returns : np.ndarray
+        Historical returns matrix (periods x assets).
+    portfolio_value : float
+        Portfolio value used to express the risk figures as amounts.
+    n_scenarios : int
+        Number of simulated scenarios per horizon.
+    levels : Sequence[float]
+        Confidence levels.
+    horizons : Sequence[int]
+        Horizons, in periods of the returns matrix.
+    method : str
+        Simulation method, 'parametric' or 'historical'.
+    seed : Optional[int]
+        Seed of the random generator.
+    workers : Optional[int]
+        Number of processes used by the simulation.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per horizon and confidence level with VaR and CVaR, in percent and
+        in value.
+    """
+    returns = np.asarray(returns, dtype=float)
+    rows = []
+    one_period = None
+    for horizon in horizons:
+        if method == "parametric":
+            # horizon returns are a location-scale transform of one-period draws,
+            # so a single simulation serves every horizon
+            if one_period is None:
+                one_period = simulate_portfolio_returns(
+                    weights,
+                    returns=returns,
+                    n_scenarios=n_scenarios,
+                    seed=seed,
+                    workers=workers,
+                )
+                mu = float(returns.mean(axis=0) @ np.asarray(weights, dtype=float))
+            simulated = mu * horizon + np.sqrt(horizon) * (one_period - mu)
+        else:
+            simulated = simulate_portfolio_returns(
+                weights,
+                returns=returns,
+                n_scenarios=n_scenarios,
+                horizon=horizon,
+                method=method,
+                seed=seed,
+                workers=workers,
+            )
+        for level in levels:
+            var, cvar = var_cvar(simulated, level)
+            rows.append(
+                {
+                    "horizon (days)": horizon,
+                    "confidence": f"{level:.0%}",
+                    "VaR (%)": var * 100,
+                    "CVaR (%)": cvar * 100,
+                    "VaR": var * portfolio_value,
+                    "CVaR": cvar * portfolio_value,
+                }
+            )
+    return pd.DataFrame(rows)
@@ -1,18 +1,390 @@
+import math
+import os
+import re
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from queue import Empty, Queue
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
+
+from lots import LOT_METHODS, LotBook
+from positions import PositionStore
 
 DATABASE = "securities_master.db"
 
+# every account other than the default one is stored in its own database file (shard)
+DEFAULT_ACCOUNT = "default"
+ACCOUNTS_DIR = "accounts"
+ACCOUNT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# number of shards queried concurrently by cross-account rollups
+ROLLUP_WORKERS = int(os.environ.get("ROLLUP_WORKERS", 8))
+
+# group commit: a write waits at most BATCH_WINDOW_MS for other writes to join its
+# transaction, and a single transaction never carries more than BATCH_MAX_ROWS statements
+BATCH_WINDOW_MS = float(os.environ.get("BATCH_WINDOW_MS", 5))
+BATCH_MAX_ROWS = int(os.environ.get("BATCH_MAX_ROWS", 500))
+
+# orders of the last ORDERS_HOT_MONTHS months stay in the orders table, older months are
+# moved to one orders_YYYY_MM partition per month and summarized in orders_rollup
+ORDERS_HOT_MONTHS = int(os.environ.get("ORDERS_HOT_MONTHS", 12))
+ORDERS_PARTITION_PATTERN = re.compile(r"^orders_(\d{4})_(\d{2})$")
+MONTH_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
 app = Flask(__name__)
 
 
-def init_db():
+class _PendingWrite:
+    """A write submitted by a single request, waiting to be committed."""
+
+    __slots__ = ("statements", "done", "error")
+
+    def __init__(self, statements: list) -> None:
+        self.statements = statements
+        self.done = threading.Event()
+        self.error = None
+
+
+class WriteBatcher:
+    """
+    Write-behind batching layer that commits the writes of concurrent requests together.
+
+    Every request hands its statements to a single writer thread, which collects the
+    writes arriving within a short window and commits them in one transaction (one
+    fsync). Each request runs inside its own savepoint, so a failing request is rolled
+    back alone and the others in the same batch are still committed.
+    """
+
+    def __init__(
+        self,
+        database: str,
+        window_ms: float = BATCH_WINDOW_MS,
+        max_rows: int = BATCH_MAX_ROWS,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        database : str
+            Path of the SQLite database the writes are committed to.
+        window_ms : float
+            Maximum time, in milliseconds, a batch stays open waiting for more writes.
+        max_rows : int
+            Maximum number of statements committed in a single transaction.
+        """
+        self.database = database
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self._queue = Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, statements: list) -> None:
+        """
+        Queues the statements of a request and blocks until they are committed.
+
+        Parameters
+        ----------
+        statements : list
+            List of (sql, params) tuples executed atomically.
+
+        Raises
+        ------
+        Exception
+            The error raised while executing or committing the statements.
+        """
+        self.wait(self.enqueue(statements))
+
+    def enqueue(self, statements: list) -> _PendingWrite:
+        """
+        Queues the statements of a request without waiting for the commit.
+
+        Writes are committed in the order they are queued, so a caller holding a lock
+        while queueing keeps its writes ordered with the lock.
+
+        Parameters
+        ----------
+        statements : list
+            List of (sql, params) tuples executed atomically.
+
+        Returns
+        -------
+        _PendingWrite
+            Handle to pass to wait().
+        """
+        pending = _PendingWrite(statements)
+        self._ensure_running()
+        self._queue.put(pending)
+        return pending
+
+    def wait(self, pending: _PendingWrite) -> None:
+        """
+        Blocks until a queued write is committed.
+
+        Raises
+        ------
+        Exception
+            The error raised while executing or committing the statements.
+        """
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+
+    def drain(self) -> None:
+        """
+        Blocks until every write queued so far is committed or has failed.
+
+        Writes are committed in queue order, so this waits for an empty write queued
+        behind them. Errors of the earlier writes are not raised.
+        """
+        pending = self.enqueue([])
+        pending.done.wait()
+
+    def _ensure_running(self) -> None:
+        """Starts the writer thread on first use."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="write-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Writer loop: collects a batch of pending writes and commits it."""
+        conn = None
+        while True:
+            batch = [self._queue.get()]
+            rows = len(batch[0].statements)
+            deadline = time.monotonic() + self.window
+            while rows < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except Empty:
+                    break
+                batch.append(pending)
+                rows += len(pending.statements)
+            try:
+                if conn is None:
+                    conn = sqlite3.connect(
+                        self.database, isolation_level=None, check_same_thread=False
+                    )
+                self._commit(conn, batch)
+            except Exception as err:
+                for pending in batch:
+                    if pending.error is None:
+                        pending.error = err
+                if conn is not None:
+                    conn.close()
+                    conn = None
+            finally:
+                for pending in batch:
+                    pending.done.set()
+
+    def _commit(self, conn: sqlite3.Connection, batch: list) -> None:
+        """
+        Executes a batch of writes in a single transaction.
+
+        Parameters
+        ----------
+        conn : sqlite3.Connection
+            Connection in autocommit mode owned by the writer thread.
+        batch : list
+            Pending writes to commit.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for pending in batch:
+                conn.execute("SAVEPOINT request")
+                try:
+                    for sql, params in pending.statements:
+                        conn.execute(sql, params)
+                    conn.execute("RELEASE request")
+                except Exception as err:
+                    conn.execute("ROLLBACK TO request")
+                    conn.execute("RELEASE request")
+                    pending.error = err
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+
+_batchers = {}
+_lot_books = {}
+_position_stores = {}
+_idle_connections = {}
+_initialized = set()
+_shards_lock = threading.Lock()
+_rollup_pool = ThreadPoolExecutor(max_workers=ROLLUP_WORKERS)
+
+
+def get_batcher(database: str) -> WriteBatcher:
+    """
+    Returns the write batcher of a database, creating it on first use.
+
+    Parameters
+    ----------
+    database : str
+        Path of the SQLite database.
+
+    Returns
+    -------
+    WriteBatcher
+        The batcher committing writes to the database.
+    """
+    with _shards_lock:
+        if database not in _batchers:
+            _batchers[database] = WriteBatcher(database)
+        return _batchers[database]
+
+
+def get_lot_book(database: str) -> LotBook:
+    """
+    Returns the in-memory lot index of a database, loading it on first use.
+
+    Parameters
+    ----------
+    database : str
+        Path of the SQLite database.
+
+    Returns
+    -------
+    LotBook
+        The open lots of the database.
+    """
+    with _shards_lock:
+        if database not in _lot_books:
+            _lot_books[database] = LotBook(database)
+        return _lot_books[database]
+
+
+def get_position_store(database: str) -> PositionStore:
+    """
+    Returns the in-memory positions of a database, loading them on first use.
+
+    Parameters
+    ----------
+    database : str
+        Path of the SQLite database.
+
+    Returns
+    -------
+    PositionStore
+        The positions of the database.
+    """
+    with _shards_lock:
+        if database not in _position_stores:
+            _position_stores[database] = PositionStore(database)
+        return _position_stores[database]
+
+
+@contextmanager
+def get_connection(database: str):
+    """
+    Borrows a read connection from the shared connection cache.
+
+    Connections are kept open per database and reused across requests, so a read does
+    not pay the cost of opening the file and parsing the schema again.
+
+    Parameters
+    ----------
+    database : str
+        Path of the SQLite database.
+
+    Yields
+    ------
+    sqlite3.Connection
+        A connection returning rows as sqlite3.Row.
+    """
+    with _shards_lock:
+        idle = _idle_connections.setdefault(database, [])
+        conn = idle.pop() if idle else None
+    if conn is None:
+        conn = sqlite3.connect(database, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        with _shards_lock:
+            _idle_connections[database].append(conn)
+
+
+def account_database(account: str) -> str:
+    """
+    Maps an account to its database shard, initializing the shard on first use.
+
+    Parameters
+    ----------
+    account : str
+        Account name. The default account is stored in DATABASE.
+
+    Returns
+    -------
+    str
+        Path of the account database.
+
+    Raises
+    ------
+    ValueError
+        If the account name is invalid.
+    """
+    if account == DEFAULT_ACCOUNT:
+        database = DATABASE
+    elif ACCOUNT_NAME_PATTERN.match(account):
+        database = os.path.join(ACCOUNTS_DIR, f"{account}.db")
+    else:
+        raise ValueError(
+            f"Invalid account name: '{account}'. Allowed characters: letters, digits, '_' and '-'."
+        )
+    if database not in _initialized:
+        with _shards_lock:
+            if database not in _initialized:
+                init_db(database)
+                _initialized.add(database)
+    return database
+
+
+def list_accounts() -> list:
+    """
+    Lists the default account and every account with a database shard.
+
+    Returns
+    -------
+    list
+        Sorted account names, default account first.
+    """
+    accounts = []
+    if os.path.isdir(ACCOUNTS_DIR):
+        accounts = sorted(
+            name[:-3]
+            for name in os.listdir(ACCOUNTS_DIR)
+            if name.endswith(".db") and ACCOUNT_NAME_PATTERN.match(name[:-3])
+        )
+    return [DEFAULT_ACCOUNT] + [a for a in accounts if a != DEFAULT_ACCOUNT]
+
+
+def invalid_account_response(err: ValueError):
+    """Builds the response returned when a request targets an invalid account."""
+    return jsonify({"error": "Invalid account", "details": str(err)}), 400
+
+
+def init_db(database: str = DATABASE):
     """
     Initialize the database and create tables if they do not exist.
     """
     try:
-        with sqlite3.connect(DATABASE) as conn:
+        directory = os.path.dirname(database)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with sqlite3.connect(database) as conn:
             conn.execute(
                 """
             CREATE TABLE IF NOT EXISTS orders (
@@ -47,47 +419,411 @@ def init_db():
             )
             """
             )
-            print("Database 'securities_master' initialized successfully.")
+            conn.execute(
+                """
+            CREATE TABLE IF NOT EXISTS lots (
+                id INTEGER PRIMARY KEY,
+                ticker VARCHAR(32) NOT NULL,
+                order_id INTEGER,
+                transaction_date DATE NOT NULL,
+                quantity INTEGER NOT NULL,
+                remaining INTEGER NOT NULL,
+                price DECIMAL(19, 3) NOT NULL,
+                currency VARCHAR(32) NOT NULL
+            )
+            """
+            )
+            conn.execute(
+                """
+            CREATE INDEX IF NOT EXISTS idx_lots_open
+            ON lots (ticker, transaction_date, id) WHERE remaining > 0
+            """
+            )
+            # realized P&L of each sell order, summed by year through a covering index
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(orders)")]
+            if "realized_pl" not in columns:
+                conn.execute("ALTER TABLE orders ADD COLUMN realized_pl DECIMAL(19, 3)")
+            conn.execute(
+                """
+            CREATE INDEX IF NOT EXISTS idx_orders_realized_pl
+            ON orders (transaction_date, currency, realized_pl)
+            """
+            )
+            # per ticker and month totals of the orders moved to archive partitions
+            conn.execute(
+                """
+            CREATE TABLE IF NOT EXISTS orders_rollup (
+                month VARCHAR(7) NOT NULL,
+                ticker VARCHAR(32) NOT NULL,
+                currency VARCHAR(32) NOT NULL,
+                order_type VARCHAR(32) NOT NULL,
+                orders INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                transaction_value DECIMAL(19, 3),
+                realized_pl DECIMAL(19, 3),
+                PRIMARY KEY (month, ticker, currency, order_type)
+            )
+            """
+            )
+            # positions opened before lots were tracked become a single lot at average cost
+            conn.execute(
+                """
+            INSERT INTO lots (ticker, order_id, transaction_date, quantity, remaining, price, currency)
+            SELECT ticker, NULL, transaction_date, quantity, quantity, avg_buy_price, currency
+            FROM portfolio WHERE ticker NOT IN (SELECT DISTINCT ticker FROM lots)
+            """
+            )
+            print(f"Database '{database}' initialized successfully.")
     except Exception as err:
         raise RuntimeError(f"Failed to initialize database: {str(err)}")
 
 
-@app.route("/orders", methods=["GET"])
-def list_orders():
+def _next_month(month: str) -> str:
+    """Returns the month after a 'YYYY-MM' month."""
+    year, number = int(month[:4]), int(month[5:])
+    return f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+
+
+def archive_partitions(conn: sqlite3.Connection) -> list:
+    """
+    Lists the archive partitions of the orders table.
+
+    Returns
+    -------
+    list
+        (month, table) tuples sorted by month, with months as 'YYYY-MM'.
+    """
+    tables = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    partitions = []
+    for (name,) in tables:
+        match = ORDERS_PARTITION_PATTERN.match(name)
+        if match:
+            partitions.append((f"{match.group(1)}-{match.group(2)}", name))
+    return sorted(partitions)
+
+
+def archive_statements(conn: sqlite3.Connection, before: str) -> tuple:
+    """
+    Plans moving the orders of every month before a given month to archive partitions.
+
+    For each month the statements create its partition, copy the orders into it, add
+    their totals to orders_rollup and delete them from the orders table. Running them
+    again for a month already archived (e.g. after a backdated order) appends to it.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection used to find the months to archive.
+    before : str
+        First month kept in the orders table, as 'YYYY-MM'.
+
+    Returns
+    -------
+    tuple
+        Archived months and the (sql, params) statements archiving them.
+    """
+    months = [
+        row[0]
+        for row in conn.execute(
+            """
+        SELECT DISTINCT substr(transaction_date, 1, 7) FROM orders
+        WHERE transaction_date < ? ORDER BY 1
+        """,
+            (f"{before}-01",),
+        )
+    ]
+    statements = []
+    for month in months:
+        table = f"orders_{month[:4]}_{month[5:]}"
+        period = (f"{month}-01", f"{_next_month(month)}-01")
+        statements += [
+            (f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM orders WHERE 0", ()),
+            (
+                f"""
+            INSERT INTO {table}
+            SELECT * FROM orders WHERE transaction_date >= ? AND transaction_date < ?
+            """,
+                period,
+            ),
+            (
+                """
+            INSERT INTO orders_rollup
+                (month, ticker, currency, order_type, orders, quantity, transaction_value, realized_pl)
+            SELECT ?, ticker, currency, UPPER(order_type), COUNT(*), SUM(quantity),
+                   TOTAL(transaction_value), TOTAL(realized_pl)
+            FROM orders WHERE transaction_date >= ? AND transaction_date < ?
+            GROUP BY ticker, currency, UPPER(order_type)
+            ON CONFLICT (month, ticker, currency, order_type) DO UPDATE SET
+                orders = orders + excluded.orders,
+                quantity = quantity + excluded.quantity,
+                transaction_value = transaction_value + excluded.transaction_value,
+                realized_pl = realized_pl + excluded.realized_pl
+            """,
+                (month, *period),
+            ),
+            (
+                "DELETE FROM orders WHERE transaction_date >= ? AND transaction_date < ?",
+                period,
+            ),
+        ]
+    return months, statements
+
+
+@app.route("/orders", methods=["GET"], defaults={"account": DEFAULT_ACCOUNT})
+@app.route("/accounts/<account>/orders", methods=["GET"])
+def list_orders(account):
     """
-    Retrieve all orders, sorted by transaction date.
+    Retrieve the orders of an account, sorted by transaction date.
+
+    Only the orders table is read by default. With ?include_archive=1 the archive
+    partitions are read too, optionally only from a ?since=YYYY-MM month on.
     """
     try:
-        with sqlite3.connect(DATABASE) as conn:
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            cur.execute("SELECT * FROM orders ORDER BY transaction_date ASC")
+        database = account_database(account)
+    except ValueError as err:
+        return invalid_account_response(err)
+    include_archive = request.args.get("include_archive", "0").lower() in ("1", "true")
+    since = request.args.get("since")
+    if since is not None and not MONTH_PATTERN.match(since):
+        return jsonify({"error": "Invalid month", "details": f"Expected YYYY-MM, got '{since}'."}), 400
+    try:
+        with get_connection(database) as conn:
+            tables = ["orders"]
+            if include_archive:
+                tables = [
+                    table
+                    for month, table in archive_partitions(conn)
+                    if since is None or month >= since
+                ] + tables
+            query = " UNION ALL ".join(f"SELECT * FROM {table}" for table in tables)
+            cur = conn.execute(f"{query} ORDER BY transaction_date ASC")
             orders = [dict(row) for row in cur.fetchall()]
             return jsonify(orders), 200
     except Exception as err:
         return jsonify({"error": f"Unable to fetch orders: {str(err)}"}), 500
 
 
-@app.route("/portfolio", methods=["GET"])
-def list_portfolio():
+@app.route("/orders/rollup", methods=["GET"], defaults={"account": DEFAULT_ACCOUNT})
+@app.route("/accounts/<account>/orders/rollup", methods=["GET"])
+def list_orders_rollup(account):
     """
-    Retrieve the current state of the portfolio.
+    Retrieve the monthly totals of archived orders, optionally filtered by ticker.
     """
     try:
-        with sqlite3.connect(DATABASE) as conn:
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            cur.execute("SELECT * FROM portfolio")
-            portfolio = [dict(row) for row in cur.fetchall()]
-            return jsonify(portfolio), 200
+        database = account_database(account)
+    except ValueError as err:
+        return invalid_account_response(err)
+    try:
+        with get_connection(database) as conn:
+            query = "SELECT * FROM orders_rollup"
+            params = ()
+            if request.args.get("ticker"):
+                query += " WHERE ticker = ?"
+                params = (request.args["ticker"],)
+            cur = conn.execute(f"{query} ORDER BY month, ticker", params)
+            return jsonify([dict(row) for row in cur.fetchall()]), 200
+    except Exception as err:
+        return jsonify({"error": f"Unable to fetch orders rollup: {str(err)}"}), 500
+
+
+@app.route("/orders/archive", methods=["POST"], defaults={"account": DEFAULT_ACCOUNT})
+@app.route("/accounts/<account>/orders/archive", methods=["POST"])
+def archive_orders(account):
+    """
+    Move the orders of closed months to archive partitions.
+
+    Months before the 'before' month of the request body ('YYYY-MM') are archived;
+    by default every month older than ORDERS_HOT_MONTHS.
+    """
+    try:
+        database = account_database(account)
+    except ValueError as err:
+        return invalid_account_response(err)
+    data = request.get_json(silent=True) or {}
+    before = data.get("before")
+    now = time.localtime()
+    current_month = f"{now.tm_year:04d}-{now.tm_mon:02d}"
+    if before is None:
+        months = now.tm_year * 12 + now.tm_mon - 1 - ORDERS_HOT_MONTHS
+        before = f"{months // 12:04d}-{months % 12 + 1:02d}"
+    elif not MONTH_PATTERN.match(str(before)):
+        return jsonify({"error": "Invalid month", "details": f"Expected YYYY-MM, got '{before}'."}), 400
+    elif before > current_month:
+        # only closed months are archived: the current month stays in the orders table
+        return (
+            jsonify(
+                {
+                    "error": "Invalid month",
+                    "details": f"Only months before {current_month} can be archived, got '{before}'.",
+                }
+            ),
+            400,
+        )
+    try:
+        with get_connection(database) as conn:
+            months, statements = archive_statements(conn, before)
+        if statements:
+            get_batcher(database).submit(statements)
+        return jsonify({"message": "Orders archived", "before": before, "months": months}), 200
+    except Exception as err:
+        return jsonify({"error": f"Unable to archive orders: {str(err)}"}), 500
+
+
+@app.route("/portfolio", methods=["GET"], defaults={"account": DEFAULT_ACCOUNT})
+@app.route("/accounts/<account>/portfolio", methods=["GET"])
+def list_portfolio(account):
+    """
+    Retrieve the current state of an account portfolio.
+    """
+    try:
+        database = account_database(account)
+    except ValueError as err:
+        return invalid_account_response(err)
+    try:
+        payload = get_position_store(database).payload()
+        return Response(payload, status=200, mimetype="application/json")
     except Exception as err:
         return jsonify({"error": f"Unable to fetch portfolio: {str(err)}"}), 500
 
 
-@app.route("/orders", methods=["POST"])
-def add_order():
+@app.route("/portfolio/summary", methods=["GET"], defaults={"account": DEFAULT_ACCOUNT})
+@app.route("/accounts/<account>/portfolio/summary", methods=["GET"])
+def portfolio_summary(account):
     """
-    Add a new order to orders table.
+    Retrieve the portfolio totals of an account, aggregated in SQL by currency.
+
+    The payload holds one row per currency, whatever the number of positions. With
+    ?weights=1 it also lists the weight of each position within its currency.
+    """
+    try:
+        database = account_database(account)
+    except ValueError as err:
+        return invalid_account_response(err)
+    try:
+        with get_connection(database) as conn:
+            totals = conn.execute(
+                """
+            SELECT currency, COUNT(*) AS positions, SUM(cost_basis) AS cost_basis,
+                   SUM(market_value) AS market_value, SUM(pl) AS pl,
+                   SUM(pl_pct * market_value) AS weighted_pl_pct
+            FROM portfolio GROUP BY currency
+            """
+            ).fetchall()
+            summary = {"totals": [dict(row) for row in totals]}
+            if request.args.get("weights", "0").lower() in ("1", "true"):
+                weights = conn.execute(
+                    """
+                SELECT ticker, currency,
+                       CAST(market_value AS REAL)
+                       / SUM(market_value) OVER (PARTITION BY currency) AS weight
+                FROM portfolio ORDER BY ticker
+                """
+                ).fetchall()
+                summary["weights"] = [dict(row) for row in weights]
+        return jsonify(summary), 200
+    except Exception as err:
+        return jsonify({"error": f"Unable to compute portfolio summary: {str(err)}"}), 500
+
+
+@app.route("/accounts", methods=["GET"])
+def get_accounts():
+    """
+    Retrieve the list of accounts.
+    """
+    return jsonify(list_accounts()), 200
+
+
+def _account_rollup(account: str) -> list:
+    """
+    Aggregates the positions of a single account, grouped by currency.
+    """
+    with get_connection(account_database(account)) as conn:
+        cur = conn.execute(
+            """
+        SELECT currency, COUNT(*) AS positions, SUM(cost_basis) AS cost_basis,
+               SUM(market_value) AS market_value, SUM(pl) AS pl
+        FROM portfolio GROUP BY currency
+        """
+        )
+        return [dict(row) for row in cur.fetchall()]
+
+
+@app.route("/accounts/summary", methods=["GET"])
+def accounts_summary():
+    """
+    Retrieve position totals of every account, computed in parallel across shards.
+    """
+    try:
+        accounts = list_accounts()
+        rollups = _rollup_pool.map(_account_rollup, accounts)
+        return jsonify(dict(zip(accounts, rollups))), 200
+    except Exception as err:
+        return jsonify({"error": f"Unable to compute accounts summary: {str(err)}"}), 500
+
+
+@app.route("/lots", methods=["GET"], defaults={"account": DEFAULT_ACCOUNT})
+@app.route("/accounts/<account>/lots", methods=["GET"])
+def list_lots(account):
+    """
+    Retrieve the open tax lots of an account, optionally filtered by ticker.
+    """
+    try:
+        database = account_database(account)
+    except ValueError as err:
+        return invalid_account_response(err)
+    try:
+        book = get_lot_book(database)
+        with book.lock:
+            lots = book.open_lots(request.args.get("ticker"))
+        return jsonify(lots), 200
+    except Exception as err:
+        return jsonify({"error": f"Unable to fetch lots: {str(err)}"}), 500
+
+
+@app.route("/realized_pl", methods=["GET"], defaults={"account": DEFAULT_ACCOUNT})
+@app.route("/accounts/<account>/realized_pl", methods=["GET"])
+def realized_pl(account):
+    """
+    Retrieve the realized P&L of a year, by currency, including archived months.
+    """
+    try:
+        database = account_database(account)
+    except ValueError as err:
+        return invalid_account_response(err)
+    try:
+        year = int(request.args.get("year", time.strftime("%Y")))
+    except ValueError:
+        return jsonify({"error": "Invalid year", "details": request.args["year"]}), 400
+    try:
+        with get_connection(database) as conn:
+            cur = conn.execute(
+                """
+            SELECT currency, SUM(realized_pl) AS realized_pl FROM (
+                SELECT currency, realized_pl FROM orders
+                WHERE transaction_date >= ? AND transaction_date < ? AND realized_pl IS NOT NULL
+                UNION ALL
+                SELECT currency, realized_pl FROM orders_rollup
+                WHERE month >= ? AND month < ? AND order_type = 'SELL'
+            )
+            GROUP BY currency
+            """,
+                (
+                    f"{year:04d}-01-01",
+                    f"{year + 1:04d}-01-01",
+                    f"{year:04d}-01",
+                    f"{year + 1:04d}-01",
+                ),
+            )
+            return jsonify({"year": year, "realized_pl": [dict(r) for r in cur]}), 200
+    except Exception as err:
+        return jsonify({"error": f"Unable to compute realized P&L: {str(err)}"}), 500
+
+
+@app.route("/orders", methods=["POST"], defaults={"account": DEFAULT_ACCOUNT})
+@app.route("/accounts/<account>/orders", methods=["POST"])
+def add_order(account):
+    """
+    Add a new order to the orders table of an account.
     """
     data = request.get_json()
     required_fields = [
@@ -115,33 +851,143 @@ def add_order():
         )
 
     try:
-        with sqlite3.connect(DATABASE) as conn:
-            conn.execute(
+        database = account_database(account)
+    except ValueError as err:
+        return invalid_account_response(err)
+
+    order_type = str(data["order_type"]).upper()
+    if order_type not in ("BUY", "SELL"):
+        return (
+            jsonify(
+                {
+                    "error": "Invalid order type",
+                    "details": f"Expected BUY or SELL, received: {data['order_type']}",
+                }
+            ),
+            400,
+        )
+
+    quantity, price = data["quantity"], data["price"]
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0:
+        return (
+            jsonify(
+                {
+                    "error": "Invalid quantity",
+                    "details": f"Expected a positive integer, received: {quantity}",
+                }
+            ),
+            400,
+        )
+    if (
+        isinstance(price, bool)
+        or not isinstance(price, (int, float))
+        or not math.isfinite(price)
+        or price < 0
+    ):
+        return (
+            jsonify(
+                {
+                    "error": "Invalid price",
+                    "details": f"Expected a non-negative number, received: {price}",
+                }
+            ),
+            400,
+        )
+
+    lot_method, lot_ids = data.get("lot_method", "FIFO"), data.get("lot_ids")
+    if not isinstance(lot_method, str) or lot_method.upper() not in LOT_METHODS:
+        return (
+            jsonify(
+                {
+                    "error": "Invalid lot method",
+                    "details": f"Expected one of {', '.join(LOT_METHODS)}, received: {lot_method}",
+                }
+            ),
+            400,
+        )
+    if lot_ids is not None and (
+        not isinstance(lot_ids, list)
+        or any(isinstance(i, bool) or not isinstance(i, int) for i in lot_ids)
+    ):
+        return (
+            jsonify(
+                {
+                    "error": "Invalid lot ids",
+                    "details": f"Expected a list of lot ids, received: {lot_ids}",
+                }
+            ),
+            400,
+        )
+
+    book = get_lot_book(database)
+    realized_pl, released_cost_basis = None, None
+    try:
+        with book.lock:
+            if order_type == "SELL":
+                realized_pl, released_cost_basis, lot_statements = book.sell(
+                    data["ticker"],
+                    data["quantity"],
+                    data["price"],
+                    method=lot_method,
+                    lot_ids=lot_ids,
+                )
+            else:
+                lot_statements = book.buy(
+                    data["ticker"],
+                    data["quantity"],
+                    data["price"],
+                    data["currency"],
+                    data["transaction_date"],
+                )
+            order_statement = (
                 """
             INSERT OR REPLACE INTO orders 
-            (ticker, order_type, quantity, currency, transaction_date, price, transaction_value, created_date, last_updated_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (ticker, order_type, quantity, currency, transaction_date, price, transaction_value, realized_pl, created_date, last_updated_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
                 (
                     data["ticker"],
-                    data["order_type"],
+                    order_type,
                     data["quantity"],
                     data["currency"],
                     data["transaction_date"],
                     data["price"],
                     data["transaction_value"],
+                    realized_pl,
                     data["created_date"],
                     data["last_updated_date"],
                 ),
             )
-        return jsonify({"message": "Order added successfully"}), 200
+            # queued under the lock, so writes commit in the order lots were matched
+            pending = get_batcher(database).enqueue([order_statement] + lot_statements)
+    except ValueError as err:
+        return jsonify({"error": "Invalid order", "details": str(err)}), 400
+
+    try:
+        get_batcher(database).wait(pending)
+        return (
+            jsonify(
+                {
+                    "message": "Order added successfully",
+                    "realized_pl": realized_pl,
+                    "released_cost_basis": released_cost_basis,
+                }
+            ),
+            200,
+        )
     except Exception as err:
+        # other requests may have matched lots already queued behind this write:
+        # reload once they are on disk, and keep new sells out until then
+        with book.lock:
+            get_batcher(database).drain()
+            book.reload()
         return jsonify({"error": f"Failed to insert order: {str(err)}"}), 500
 
 
-@app.route("/portfolio", methods=["POST"])
-def update_portfolio():
+@app.route("/portfolio", methods=["POST"], defaults={"account": DEFAULT_ACCOUNT})
+@app.route("/accounts/<account>/portfolio", methods=["POST"])
+def update_portfolio(account):
     """
-    Create, update or delete portfolio position.
+    Create, update or delete an account portfolio position.
     """
     data = request.get_json()
     required_fields = [
@@ -171,45 +1017,68 @@ def update_portfolio():
         )
 
     try:
-        with sqlite3.connect(DATABASE) as conn:
-            if data["quantity"] == 0:
-                conn.execute(
-                    "DELETE FROM portfolio WHERE ticker = ?", (data["ticker"],)
-                )
-                return (
-                    jsonify(
-                        {
-                            "message": f"Closed {data['ticker']} position. Removed from portfolio."
-                        }
-                    ),
-                    200,
-                )
-            else:
-                conn.execute(
-                    """
-                INSERT OR REPLACE INTO portfolio 
-                (ticker, quantity, currency, transaction_date, avg_buy_price, cost_basis, market_price, market_value, pl, pl_pct, created_date, last_updated_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
+        database = account_database(account)
+    except ValueError as err:
+        return invalid_account_response(err)
+
+    store = get_position_store(database)
+    batcher = get_batcher(database)
+    # the store is updated when the write is queued, in the same order as the queue
+    with store.lock:
+        if data["quantity"] == 0:
+            store.remove(data["ticker"])
+            pending = batcher.enqueue(
+                [("DELETE FROM portfolio WHERE ticker = ?", (data["ticker"],))]
+            )
+        else:
+            store.upsert(data)
+            pending = batcher.enqueue(
+                [
                     (
-                        data["ticker"],
-                        data["quantity"],
-                        data["currency"],
-                        data["transaction_date"],
-                        data["avg_buy_price"],
-                        data["cost_basis"],
-                        data["market_price"],
-                        data["market_value"],
-                        data["pl"],
-                        data["pl_pct"],
-                        data["created_date"],
-                        data["last_updated_date"],
-                    ),
-                )
+                        """
+            INSERT OR REPLACE INTO portfolio 
+            (ticker, quantity, currency, transaction_date, avg_buy_price, cost_basis, market_price, market_value, pl, pl_pct, created_date, last_updated_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                        (
+                            data["ticker"],
+                            data["quantity"],
+                            data["currency"],
+                            data["transaction_date"],
+                            data["avg_buy_price"],
+                            data["cost_basis"],
+                            data["market_price"],
+                            data["market_value"],
+                            data["pl"],
+                            data["pl_pct"],
+                            data["created_date"],
+                            data["last_updated_date"],
+                        ),
+                    )
+                ]
+            )
+
+    try:
+        batcher.wait(pending)
+        if data["quantity"] == 0:
+            return (
+                jsonify(
+                    {
+                        "message": f"Closed {data['ticker']} position. Removed from portfolio."
+                    }
+                ),
+                200,
+            )
         return jsonify({"message": "Portfolio updated successfully"}), 200
     except Exception as err:
+        # positions of writes queued behind this one are reloaded once on disk
+        with store.lock:
+            batcher.drain()
+            store.reload()
         return jsonify({"error": f"Failed to updated portfolio: {str(err)}"}), 500
 
 
 if __name__ == "__main__":
     init_db()
+    _initialized.add(DATABASE)
+    get_position_store(DATABASE)
     app.run(debug=True)
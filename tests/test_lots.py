@@ -0,0 +1,164 @@
+import sqlite3
+
+import pytest
+
+import server
+from lots import LotBook
+
+
+@pytest.fixture
+def book(tmp_path):
+    database = str(tmp_path / "lots.db")
+    server.init_db(database)
+    book = LotBook(database)
+    for date, quantity, price in (
+        ("2024-01-01", 5, 10.0),
+        ("2024-02-01", 5, 20.0),
+        ("2024-03-01", 5, 30.0),
+    ):
+        commit(book, book.buy("AAA", quantity, price, "USD", date))
+    return book
+
+
+def commit(book, statements):
+    with sqlite3.connect(book.database) as conn:
+        conn.execute(
+            """
+            INSERT INTO orders (ticker, order_type, quantity, currency, transaction_date, price, transaction_value, created_date, last_updated_date)
+            VALUES ('AAA', 'BUY', 0, 'USD', '2024-01-01', 0, 0, '2024-01-01', '2024-01-01')
+            """
+        )
+        for sql, params in statements:
+            conn.execute(sql, params)
+
+
+def remaining(book):
+    return [lot["remaining"] for lot in book.open_lots("AAA")]
+
+
+def stored_remaining(book):
+    with sqlite3.connect(book.database) as conn:
+        return [row[0] for row in conn.execute("SELECT remaining FROM lots ORDER BY id")]
+
+
+def test_fifo_consumes_oldest_lots(book):
+    realized_pl, released, statements = book.sell("AAA", 7, 40.0)
+    commit(book, statements)
+    assert realized_pl == 5 * 30 + 2 * 20
+    assert released == 5 * 10 + 2 * 20
+    assert remaining(book) == [3, 5]
+    assert stored_remaining(book) == [0, 3, 5]
+
+
+def test_lifo_consumes_newest_lots(book):
+    realized_pl, released, statements = book.sell("AAA", 7, 40.0, method="LIFO")
+    commit(book, statements)
+    assert realized_pl == 5 * 10 + 2 * 20
+    assert released == 5 * 30 + 2 * 20
+    assert remaining(book) == [5, 3]
+    assert stored_remaining(book) == [5, 3, 0]
+
+
+def test_specific_consumes_listed_lots_in_order(book):
+    realized_pl, released, statements = book.sell(
+        "AAA", 7, 40.0, method="SPECIFIC", lot_ids=[2, 3]
+    )
+    commit(book, statements)
+    assert realized_pl == 5 * 20 + 2 * 10
+    assert released == 5 * 20 + 2 * 30
+    assert remaining(book) == [5, 3]
+    # a lot closed by specific identification is skipped by later FIFO sells
+    _, released, statements = book.sell("AAA", 6, 40.0)
+    commit(book, statements)
+    assert released == 5 * 10 + 1 * 30
+    assert remaining(book) == [2]
+
+
+def test_specific_rejects_duplicate_lot_ids(book):
+    with pytest.raises(ValueError, match="only once"):
+        book.sell("AAA", 10, 40.0, method="SPECIFIC", lot_ids=[1, 1])
+    assert remaining(book) == [5, 5, 5]
+    # the book is still consistent for the next sell
+    _, _, statements = book.sell("AAA", 15, 40.0)
+    commit(book, statements)
+    assert remaining(book) == []
+    assert stored_remaining(book) == [0, 0, 0]
+
+
+def test_specific_rejects_lot_of_another_ticker(book):
+    with pytest.raises(ValueError, match="not an open lot"):
+        book.sell("BBB", 1, 40.0, method="SPECIFIC", lot_ids=[1])
+
+
+@pytest.mark.parametrize("method", ["FIFO", "LIFO"])
+def test_insufficient_lots_leave_book_untouched(book, method):
+    with pytest.raises(ValueError, match="Not enough open lots"):
+        book.sell("AAA", 16, 40.0, method=method)
+    assert remaining(book) == [5, 5, 5]
+
+
+def test_insufficient_specific_lots(book):
+    with pytest.raises(ValueError, match=r"\(5 available\)"):
+        book.sell("AAA", 6, 40.0, method="SPECIFIC", lot_ids=[1])
+    assert remaining(book) == [5, 5, 5]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "ACCOUNTS_DIR", str(tmp_path))
+    return server.app.test_client()
+
+
+def order(**fields):
+    data = {
+        "ticker": "AAA",
+        "order_type": "BUY",
+        "quantity": 5,
+        "currency": "USD",
+        "transaction_date": "2024-01-01",
+        "price": 10.0,
+        "transaction_value": 50.0,
+        "created_date": "2024-01-01",
+        "last_updated_date": "2024-01-01",
+    }
+    data.update(fields)
+    return data
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"quantity": 0},
+        {"quantity": -5},
+        {"quantity": 1.5},
+        {"quantity": "5"},
+        {"price": None},
+        {"price": "10"},
+        {"price": -1},
+        {"order_type": "SELL", "lot_method": None},
+        {"order_type": "SELL", "lot_method": "HIFO"},
+        {"order_type": "SELL", "lot_method": "SPECIFIC", "lot_ids": "12"},
+        {"order_type": "SELL", "lot_method": "SPECIFIC", "lot_ids": 5},
+        {"order_type": "SELL", "lot_method": "SPECIFIC", "lot_ids": [None]},
+    ],
+)
+def test_add_order_rejects_invalid_quantity_or_price(client, fields):
+    # open lots 1 and 2, so that a sell reaching the book would succeed
+    for _ in range(2):
+        assert client.post("/accounts/test/orders", json=order()).status_code == 200
+    response = client.post("/accounts/test/orders", json=order(**fields))
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Invalid ")
+    assert response.get_json()["error"] != "Invalid order"
+
+
+def test_add_order_rejects_duplicate_lot_ids(client):
+    assert client.post("/accounts/test/orders", json=order()).status_code == 200
+    response = client.post(
+        "/accounts/test/orders",
+        json=order(order_type="SELL", quantity=10, lot_method="SPECIFIC", lot_ids=[1, 1]),
+    )
+    assert response.status_code == 400
+    response = client.post("/accounts/test/orders", json=order(order_type="SELL", price=12.0))
+    assert response.status_code == 200
+    assert response.get_json()["realized_pl"] == 10.0
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+class WhatIfEngine:
+    """
+    Pre-trade impact of an order on weights, volatility and risk contributions.
+
+    The covariance matrix S, the current weights w, S w and w' S w are computed once.
+    A trade changing the value of asset k by d moves the book from value V to
+    V' = V + d and the weights to
+
+        w' = a w + b e_k,   a = V / V',  b = d / V'
+
+    so the new variance a^2 w'Sw + 2ab (Sw)_k + b^2 S_kk costs O(1), and the new
+    weights and marginal risks (S w' = a Sw + b S e_k) cost O(N), with no download
+    and no matrix product.
+    """
+
+    def __init__(
+        self,
+        cov: pd.DataFrame,
+        market_values: pd.Series,
+        prices: Optional[pd.Series] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        cov : pd.DataFrame
+            Annualized covariance matrix of asset returns, indexed by ticker.
+        market_values : pd.Series
+            Market value of each position in the base currency, indexed by ticker.
+        prices : Optional[pd.Series]
+            Market price of each asset in the base currency, used when an order has
+            no price.
+
+        Raises
+        ------
+        ValueError
+            If the book has no market value.
+        """
+        self.tickers = list(cov.index)
+        self._index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._cov = cov.to_numpy(dtype=float)
+        values = market_values.reindex(self.tickers).fillna(0.0).to_numpy(dtype=float)
+        self.value = float(values.sum())
+        if self.value <= 0:
+            raise ValueError("The portfolio has no market value to compare the trade with.")
+        self.weights = values / self.value
+        self._cov_w = self._cov @ self.weights
+        self._variance = float(self.weights @ self._cov_w)
+        self._sum_sq = float(self.weights @ self.weights)
+        self.prices = prices if prices is not None else pd.Series(dtype=float)
+
+    @property
+    def volatility(self) -> float:
+        """Annualized volatility of the current book."""
+        return float(np.sqrt(self._variance))
+
+    def preview(self, ticker: str, value_change: float) -> dict:
+        """
+        Computes the impact of changing the position in an asset by a given value.
+
+        Parameters
+        ----------
+        ticker : str
+            Ticker symbol of the traded asset.
+        value_change : float
+            Value bought (positive) or sold (negative), in the base currency.
+
+        Returns
+        -------
+        dict
+            New 'weights', 'marginal_risk' (d volatility / d weight) and
+            'risk_contribution' (share of variance) arrays in ticker order, and the
+            'volatility', 'max_weight' and 'hhi' (sum of squared weights) floats.
+
+        Raises
+        ------
+        ValueError
+            If the asset has no covariance estimate, or the trade sells more than
+            the position or the whole book.
+        """
+        k = self._index.get(ticker)
+        if k is None:
+            raise ValueError(
+                f"No covariance estimate for '{ticker}': the preview covers held assets only."
+            )
+        if self.weights[k] * self.value + value_change < -1e-9:
+            raise ValueError(f"The trade sells more '{ticker}' than the position holds.")
+        new_value = self.value + value_change
+        if new_value <= 0:
+            raise ValueError("The trade would leave the portfolio without market value.")
+        a, b = self.value / new_value, value_change / new_value
+
+        variance = a * a * self._variance + 2 * a * b * self._cov_w[k] + b * b * self._cov[k, k]
+        volatility = float(np.sqrt(max(variance, 0.0)))
+        weights = a * self.weights
+        weights[k] += b
+        cov_w = a * self._cov_w + b * self._cov[:, k]
+        marginal = cov_w / volatility if volatility > 0 else np.zeros_like(cov_w)
+        contribution = weights * cov_w / variance if variance > 0 else np.zeros_like(cov_w)
+        return {
+            "weights": weights,
+            "marginal_risk": marginal,
+            "risk_contribution": contribution,
+            "volatility": volatility,
+            "max_weight": float(weights.max()),
+            "hhi": a * a * self._sum_sq + 2 * a * b * self.weights[k] + b * b,
+        }
+
+    def preview_order(
+        self,
+        ticker: str,
+        quantity: float,
+        order_type: str,
+        price: Optional[float] = None,
+        fx_rate: float = 1.0,
+    ) -> dict:
+        """
+        Computes the impact of an order, see preview().
+
+        Parameters
+        ----------
+        ticker : str
+            Ticker symbol of the traded asset.
+        quantity : float
+            Number of contracts.
+        order_type : str
+            'BUY' or 'SELL'.
+        price : Optional[float]
+            Price per contract in the trade currency. Defaults to the market price.
+        fx_rate : float
+            Rate of the trade currency against the base currency, applied to price.
+
+        Returns
+        -------
+        dict
+            See preview().
+        """
+        if price is None:
+            if ticker not in self.prices.index:
+                raise ValueError(f"No market price for '{ticker}': enter a price.")
+            base_price = float(self.prices[ticker])
+        else:
+            base_price = price * fx_rate
+        sign = -1.0 if order_type.upper() == "SELL" else 1.0
+        return self.preview(ticker, sign * quantity * base_price)
+
+    def impact_table(self, impact: dict) -> pd.DataFrame:
+        """
+        Tabulates the weights and risk contributions before and after a trade.
+
+        Parameters
+        ----------
+        impact : dict
+            Result of preview().
+
+        Returns
+        -------
+        pd.DataFrame
+            Current and new weight and risk contribution of each asset.
+        """
+        current_contribution = (
+            self.weights * self._cov_w / self._variance
+            if self._variance > 0
+            else np.zeros(len(self.tickers))
+        )
+        return pd.DataFrame(
+            {
+                "current weight": self.weights,
+                "new weight": impact["weights"],
+                "current risk contribution": current_contribution,
+                "new risk contribution": impact["risk_contribution"],
+            },
+            index=pd.Index(self.tickers, name="ticker"),
+        )